@@ -0,0 +1 @@
+# Benchmarks for the sms data layer; see run.py.
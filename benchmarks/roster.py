@@ -0,0 +1,87 @@
+# Deterministic synthetic roster for the benchmarks: colleges.csv,
+# programs.csv and students.csv in the app's own formats. The same seed
+# and size always give the same files.
+#
+#   python -m benchmarks.roster OUTDIR --students 100000
+import argparse
+import os
+import random
+
+from sms.catalog import COLLEGE_FIELDS, PROGRAM_FIELDS
+from sms.files import COLLEGE_CSV, PROGRAM_CSV, STUDENT_CSV, write_csv
+from sms.students import STUDENT_FIELDS
+
+COLLEGES = [
+    ("College of Engineering", "COE"),
+    ("College of Computer Studies", "CCS"),
+    ("College of Education", "CED"),
+    ("College of Health Sciences", "CHS"),
+    ("College of Science and Mathematics", "CSM"),
+    ("College of Arts and Social Sciences", "CASS"),
+    ("College of Economics Business and Accountancy", "CEBA"),
+    ("College of Nursing", "CON"),
+]
+FIELDS = [
+    "Civil Engineering", "Computer Science", "Information Technology", "Biology", "Chemistry",
+    "Mathematics", "Physics", "History", "Psychology", "Accountancy", "Economics", "Marketing",
+    "Nursing", "Elementary Education", "Secondary Education", "Statistics", "Sociology",
+    "Mechanical Engineering", "Electrical Engineering", "Information Systems", "Philosophy",
+    "Political Science", "Entrepreneurship", "Hospitality Management",
+]
+PROGRAMS_PER_COLLEGE = 6
+LAST_NAMES = [
+    "Abad", "Aquino", "Bautista", "Castillo", "Cruz", "Dela Cruz", "Diaz", "Flores", "Garcia",
+    "Gonzales", "Hernandez", "Lee", "Lim", "Lopez", "Martinez", "Mendoza", "Morales", "Navarro",
+    "Ocampo", "Perez", "Ramos", "Reyes", "Rivera", "Santos", "Smith", "Tan", "Torres", "Villanueva",
+    "Brown", "Johnson", "Miller", "Nguyen", "Ortiz", "Pascual", "Quinto", "Salazar", "Uy", "Yap",
+]
+FIRST_NAMES = [
+    "Alex", "Angel", "Anna", "Ben", "Carla", "Charlie", "Dana", "Diego", "Elena", "Emery", "Grace",
+    "Isabel", "Jamie", "John", "Jordan", "Jose", "Kim", "Lara", "Leo", "Maria", "Mark", "Mia",
+    "Morgan", "Nico", "Paolo", "Rosa", "Sam", "Sky", "Taylor", "Vince", "Yna", "Zoe",
+]
+
+def catalog_rows():
+    # (college rows, program rows); every college gets PROGRAMS_PER_COLLEGE
+    # programs with made-up but valid names and unique codes
+    colleges = [{'College Name': name, 'College Code': code} for name, code in COLLEGES]
+    programs = []
+    for i, (college, college_code) in enumerate(COLLEGES):
+        for j in range(PROGRAMS_PER_COLLEGE):
+            field = FIELDS[(i * PROGRAMS_PER_COLLEGE + j) % len(FIELDS)]
+            programs.append({'Program Name': f"Bachelor of Science in {field} {college_code}",
+                             'Program Code': f"BS{college_code}{j + 1}",
+                             'College Name': college, 'College Code': college_code})
+    return colleges, programs
+
+def student_rows(count, programs, seed=0):
+    rng = random.Random(seed)
+    for i in range(count):
+        program = rng.choice(programs)
+        yield {'Student ID': f"{2000 + i // 10000:04d}-{i % 10000:04d}",
+               'Last Name': rng.choice(LAST_NAMES), 'First Name': rng.choice(FIRST_NAMES),
+               'Gender': rng.choice(("Male", "Female")),
+               'College': program['College Name'], 'College Code': program['College Code'],
+               'Program': program['Program Name'], 'Program Code': program['Program Code'],
+               'Year': rng.choice("1234")}
+
+def write_roster(directory, students, seed=0):
+    # Writes the three CSVs into directory (at most 1,000,000 students, as
+    # the IDs are YYYY-NNNN from 2000-0000 on)
+    os.makedirs(directory, exist_ok=True)
+    colleges, programs = catalog_rows()
+    write_csv(os.path.join(directory, COLLEGE_CSV), COLLEGE_FIELDS, colleges)
+    write_csv(os.path.join(directory, PROGRAM_CSV), PROGRAM_FIELDS, programs)
+    write_csv(os.path.join(directory, STUDENT_CSV), STUDENT_FIELDS, student_rows(students, programs, seed))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='benchmarks.roster', description="Write a synthetic roster.")
+    parser.add_argument('directory')
+    parser.add_argument('--students', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    write_roster(args.directory, args.students, args.seed)
+    print(f"Wrote {args.students} student(s) to {args.directory}.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,257 @@
+# Times the main operations of the sms data layer (no display needed) on
+# synthetic rosters of increasing size and reports them as JSON and a
+# Markdown table, compared with a stored baseline.
+#
+#   python -m benchmarks.run                      # 1k, 10k, 100k and 1M students
+#   python -m benchmarks.run --sizes 1k,10k --markdown report.md
+#   python -m benchmarks.run --save-baseline      # make this run the baseline
+#
+# Each operation runs --repeat times (loading from scratch each time, the
+# rest on the same data); edits use a different student/college/program
+# each time. A fixed pure-Python workload, reference_work(), is timed
+# before every run as well, and the reports (the baseline included) store
+# each operation as a multiple of its fastest time for the size rather
+# than in seconds. That ratio stays put on a faster or slower machine, or
+# one that is busy for a while, so a baseline recorded elsewhere still
+# compares.
+#
+# A report keeps each operation's fastest run ('results') and its median
+# run ('typical'). The comparison takes the fastest run now against the
+# baseline's median: some operations land in a faster or slower mode from
+# one process to the next (memory layout), and a lucky baseline would
+# otherwise fail an unchanged tree. An operation more than --threshold
+# slower than that (and by more than NOISE_FLOOR_S) is a regression, once
+# it is still there after measuring that size again (--retries), and the
+# run exits with status 1.
+import argparse
+from datetime import datetime, timezone
+import gc
+import json
+import os
+import platform
+from statistics import median
+import sys
+import tempfile
+import time
+
+from sms.logic import CollegeManagerLogic, ProgramManagerLogic, open_data
+from sms.query import numpy
+from sms.students import StudentRecord, validate_student_data
+
+from .roster import write_roster
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+SIZES = {'1k': 1000, '10k': 10000, '100k': 100000, '1m': 1000000}
+NOISE_FLOOR_S = 0.002
+REFERENCE_WORDS = 20000
+SEARCHES = ["lee", "gar", "2003-01", "maria santos", "computer"]
+OPERATIONS = ['load', 'search', 'filter', 'sort', 'facet_counts', 'register', 'delete',
+              'college_rename', 'program_delete']
+
+def reference_work():
+    # Hashing, string handling and sorting, like most of what is timed
+    words = [f"{i * 7919 % 10007:05d} Student" for i in range(REFERENCE_WORDS)]
+    index = {word: i for i, word in enumerate(words)}
+    return sorted(index, key=str.lower)
+
+def timed(run, repeat, references):
+    # Seconds taken by each run(i) for i in range(repeat). reference_work()
+    # is timed just before each into references, and garbage from the
+    # previous run is collected first so it isn't charged to this one.
+    times = []
+    for i in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        reference_work()
+        middle = time.perf_counter()
+        run(i)
+        references.append(middle - start)
+        times.append(time.perf_counter() - middle)
+    return times
+
+def bench_roster(repeat):
+    # ({operation: [seconds per run]}, fastest reference seconds) for the
+    # roster in the current directory
+    results = {}
+    references = []
+    loads = []
+
+    def load(i):
+        if loads:
+            loads.pop().repo.close()
+        loads.append(open_data())
+    results['load'] = timed(load, repeat, references)
+    data = loads.pop()
+    repo, catalog = data.repo, data.catalog
+    college = catalog.colleges[0]
+    program = catalog.programs[0]
+
+    results['search'] = timed(lambda i: repo.query(student_ids=data.search_index.search(SEARCHES[i % len(SEARCHES)])),
+                              repeat, references)
+    results['filter'] = timed(lambda i: repo.query(college.name, "All Programs", "Female"), repeat, references)
+    results['sort'] = timed(lambda i: repo.query(sort_option="Last Name Asc"), repeat, references)
+    results['facet_counts'] = timed(lambda i: repo.facet_counts(college.name, "All Programs", "Female"),
+                                    repeat, references)
+
+    def register(i):
+        form = {"id": f"2999-{i:04d}", "last_name": "Bench", "first_name": "Mark", "gender": "Male",
+                "year": "1", "college": college.name, "program": program.name}
+        if not validate_student_data(form):
+            repo.add(StudentRecord(form["id"], form["last_name"], form["first_name"], form["gender"],
+                                   form["year"], program.college, program))
+    results['register'] = timed(register, repeat, references)
+
+    victims = list(repo.students)[::max(1, len(repo) // (repeat + 1))][:repeat]
+    results['delete'] = timed(lambda i: repo.delete(victims[i]), repeat, references)
+
+    colleges = CollegeManagerLogic(data)
+
+    def rename_college(i):
+        # A code change logs each of the college's students again
+        college = catalog.colleges[i % len(catalog.colleges)]
+        colleges.edit_college(college.code, f"Renamed College {i}", f"R{i}{college.code}")
+    results['college_rename'] = timed(rename_college, repeat, references)
+
+    programs = ProgramManagerLogic(data)
+    results['program_delete'] = timed(lambda i: programs.delete_program(0), repeat, references)
+    repo.close()
+    return results, min(references)
+
+def measure(sizes, repeat):
+    # {size: ({operation: [seconds per run]}, reference seconds)} on a
+    # freshly written roster per size
+    results = {}
+    cwd = os.getcwd()
+    for label in sizes:
+        with tempfile.TemporaryDirectory(prefix='sms-bench-') as directory:
+            write_roster(directory, SIZES[label])
+            os.chdir(directory)
+            try:
+                results[label] = bench_roster(repeat)
+            finally:
+                os.chdir(cwd)
+        print(f"{label}: done", file=sys.stderr)
+    return results
+
+def ratios(timings, reference, pick=min):
+    return {operation: pick(times) / reference for operation, times in timings.items()}
+
+def run(sizes, repeat):
+    # The report: 'results' holds {size: {operation: fastest run as a
+    # multiple of the reference time}}, 'typical' the same for the median
+    # run, and 'reference' the reference seconds per size, which only turn
+    # the ratios back into times for the table
+    measured = measure(sizes, repeat)
+    return {
+        'meta': {'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                 'python': platform.python_version(), 'platform': platform.platform(),
+                 'numpy': numpy.__version__ if numpy is not None else None,
+                 'storage': os.environ.get('SMS_STORAGE', 'csv'), 'repeat': repeat},
+        'results': {label: ratios(timings, reference) for label, (timings, reference) in measured.items()},
+        'typical': {label: ratios(timings, reference, median) for label, (timings, reference) in measured.items()},
+        'reference': {label: reference for label, (timings, reference) in measured.items()},
+    }
+
+def baseline_ratio(baseline, label, operation):
+    return baseline.get('typical', {}).get(label, {}).get(operation)
+
+def compare(report, baseline, threshold):
+    # {(size, operation): now / baseline} for the operations whose fastest
+    # ratio is above the baseline's median by more than the threshold allows
+    regressions = {}
+    for label, results in report['results'].items():
+        reference = report['reference'][label]
+        for operation, ratio in results.items():
+            base = baseline_ratio(baseline, label, operation)
+            if base and ratio > base * (1 + threshold) and (ratio - base) * reference > NOISE_FLOOR_S:
+                regressions[(label, operation)] = ratio / base
+    return regressions
+
+def confirm(report, baseline, threshold, retries):
+    # Measures the sizes with regressions again, up to retries times,
+    # keeping each operation's lowest ratio. A slower spell of the machine
+    # passes; a real regression shows up every time. Returns what is left.
+    regressions = compare(report, baseline, threshold)
+    for _ in range(retries):
+        if not regressions:
+            break
+        sizes = sorted({label for label, operation in regressions}, key=list(SIZES).index)
+        print(f"Measuring {', '.join(sizes)} again to confirm", file=sys.stderr)
+        for label, (timings, reference) in measure(sizes, report['meta']['repeat']).items():
+            results = report['results'][label]
+            for operation, ratio in ratios(timings, reference).items():
+                results[operation] = min(results[operation], ratio)
+        regressions = compare(report, baseline, threshold)
+    return regressions
+
+def markdown(report, baseline=None, regressions=()):
+    labels = list(report['results'])
+    meta = report['meta']
+    lines = [f"Python {meta['python']} on {meta['platform']}, NumPy {meta['numpy'] or 'not installed'}, "
+             f"{meta['storage']} storage, fastest of {meta['repeat']} run(s)."]
+    if baseline is not None:
+        lines.append(f"Change is against the median run of the baseline from {baseline['meta']['date']}, "
+                     f"compared as multiples of the reference workload's time; regressions are in bold.")
+    lines += ["", "| Operation | " + " | ".join(labels) + " |", "|---" * (len(labels) + 1) + "|"]
+    for operation in OPERATIONS:
+        cells = []
+        for label in labels:
+            ratio = report['results'][label].get(operation)
+            if ratio is None:
+                cells.append("")
+                continue
+            cell = f"{ratio * report['reference'][label] * 1000:.2f} ms"
+            base = None if baseline is None else baseline_ratio(baseline, label, operation)
+            if base:
+                change = f"{(ratio / base - 1) * 100:+.0f}%"
+                cell += f" (**{change}**)" if (label, operation) in regressions else f" ({change})"
+            cells.append(cell)
+        lines.append(f"| {operation} | " + " | ".join(cells) + " |")
+    lines.append("| reference | " + " | ".join(f"{report['reference'][label] * 1000:.2f} ms" for label in labels) + " |")
+    return "\n".join(lines) + "\n"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='benchmarks.run', description="Benchmark the sms data layer.")
+    parser.add_argument('--sizes', default=','.join(SIZES),
+                        help=f"comma-separated roster sizes out of {', '.join(SIZES)} (default: all)")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--baseline', default=BASELINE, help="baseline report to compare with")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="slowdown over the baseline counted as a regression (default: 0.25)")
+    parser.add_argument('--retries', type=int, default=2,
+                        help="times to re-measure a size with regressions before reporting them (default: 2)")
+    parser.add_argument('--save-baseline', action='store_true', help="write this run to --baseline")
+    parser.add_argument('--json', help="write the report as JSON here")
+    parser.add_argument('--markdown', help="write the Markdown table here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    sizes = [size.strip().lower() for size in args.sizes.split(',') if size.strip()]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        parser.error(f"unknown size(s): {', '.join(unknown)}")
+    report = run(sizes, args.repeat)
+
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    regressions = {} if baseline is None else confirm(report, baseline, args.threshold, args.retries)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    table = markdown(report, baseline, regressions)
+    if args.markdown:
+        with open(args.markdown, 'w', encoding='utf-8') as f:
+            f.write(table)
+    else:
+        print(table)
+    for (label, operation), ratio in regressions.items():
+        print(f"Regression: {operation} at {label} is {ratio:.2f}x the baseline", file=sys.stderr)
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,9 +1,18 @@
 import tkinter as tk
-from tkinter import font, messagebox, ttk, Toplevel
-from collections import defaultdict
+from tkinter import filedialog, font, messagebox, ttk, Toplevel
 import csv
 import os
+import queue
 import re
+import sqlite3
+import threading
+import time
+
+from sms.files import write_csv
+from sms.importing import IMPORT_ERROR_PREVIEW, import_students, write_import_errors
+from sms.logic import CollegeManagerLogic, ProgramManagerLogic, open_data
+from sms.query import FACET_ALL, FACETS, IncrementalSearch
+from sms.students import LOAD_CHUNK_ROWS, STUDENT_FIELDS, StudentRecord, diff_student_rows
 
 CSV_STUDENTS = "students.csv"
 CSV_COLLEGES = "colleges.csv"
@@ -30,196 +39,18 @@ def populate_form(student_data):
 
     program_filter.set(student_data[6]) 
 
-def find_student_in_csv(student_id):
-
-    try:
-        with open("students.csv", mode="r", newline="", encoding="utf-8") as file:
-            reader = csv.reader(file)
-            for row in reader:
-                if row and row[0] == student_id:
-                    return row 
-    except FileNotFoundError:
-        messagebox.showerror("Error", "CSV file not found.")
-    return None
-
-def save_to_csv(update_mode=False, old_id=None):
-    global saved_label, students
-
-    file_path = "students.csv"
-    headers = ["ID No.", "Last Name", "First Name", "Gender", "Year Level", "College", "Program"]
-
-    student_id = id_no.get().strip()
-    last_name_value = last_name.get().strip().title()
-    first_name_value = first_name.get().strip().title()
-
-    student_data = [
-        student_id,
-        last_name_value,
-        first_name_value,
-        gender_filter.get(),
-        year_dropdown.get(),
-        college_filter.get(),
-        program_filter.get()
-    ]
-
-    validate_student_data()
-    if errors:
-        messagebox.showerror("Form Error", "There are errors in your form:\n\n" + "\n".join(errors))
-        return
-
-    file_exists = os.path.exists(file_path)
-    updated_rows = []
-    existing_student = None
-
-    if file_exists:
-        with open(file_path, "r", newline="", encoding="utf-8") as file:
-            reader = csv.reader(file)
-            headers = next(reader)
-
-            for row in reader:
-                if not row:
-                    continue
-                # If we're updating, remove the old student by old_id
-                if update_mode and row[0] == old_id:
-                    continue
-                # If adding, check for duplicate ID
-                if not update_mode and row[0] == student_id:
-                    existing_student = row
-                    continue
-                updated_rows.append(row)
-
-    if not update_mode and existing_student:
-        existing_info = f"ID No.: {existing_student[0]}\nName: {existing_student[1]} {existing_student[2]}\nGender: {existing_student[3]}\nYear Level: {existing_student[4]}\nCollege: {existing_student[5]}\nProgram: {existing_student[6]}"
-        confirm = messagebox.askyesno(
-            "ID Already Exists",
-            f"A student with ID No. {student_id} already exists.\n\n{existing_info}\n\nDo you want to override this student?"
-        )
-        if not confirm:
-            return
-
-    # Add the new/updated student row
-    updated_rows.append(student_data)
-
-    # Write back to CSV
-    with open(file_path, "w", newline="", encoding="utf-8") as file:
-        writer = csv.writer(file)
-        writer.writerow(headers)
-        writer.writerows(updated_rows)
-
-    # Refresh UI
-    students = load_students()
-
-    # Reset form
-    id_no.delete(0, "end")
-    id_no.insert(0, "Ex: 1234-5678")
-    id_no.config(fg="gray", justify="center")
-
-    last_name.delete(0, "end")
-    first_name.delete(0, "end")
-    gender_filter.set("Select")
-    gender_filter.configure(foreground="gray")
-    year_dropdown.set("Select")
-    year_dropdown.configure(foreground="gray")
-
-    college_filter.set("Select")
-    college_filter.configure(foreground="gray")
-    program_filter["state"] = "normal"
-    program_filter.delete(0, "end")
-    program_filter.insert(0, "Select College First")
-    program_filter["state"] = "readonly"
-    program_filter.configure(foreground="gray")
-
-    saved_label = Label(root, bg="lightgray", width=30, text="Saved Successfully!", fg="green", font=("Arial", 10, "bold"))
-    bind_reset_events()
-    refresh_filter_dropdowns()
-    refresh_students()
-    refresh_table()
-    update_summary()
-
-    
-    
 def refresh_filter_dropdowns():
     
     global college_filter, college_filter_var, program_filter, program_filter_var
 
     colleges = load_colleges(return_list=True)
     college_filter_var.set("All Colleges")
-    college_filter['values'] = colleges
-
-    selected_college = college_filter_var.get()
-    programs = load_programs(selected_college)
     program_filter_var.set("All Programs")
-    program_filter['values'] = programs
-
-def validate_student_data(data):
-    errors = []
-
-    if not re.match(r"^\d{4}-\d{4}$", data["id"]) or any(char.isalpha() for char in data["id"]):
-        errors.append("• ID No. must be in the format XXXX-XXXX (e.g., 2024-1234) and contain only numbers.")
-
-    for name_field in ["last_name", "first_name"]:
-        value = data[name_field].title()
-        if any(char.isdigit() for char in value):
-            errors.append(f"• {name_field.replace('_', ' ').title()} must not contain numbers.")
-        if not all(char.isalpha() or char in [' ', '-'] for char in value):
-            errors.append(f"• {name_field.replace('_', ' ').title()} must contain only letters, spaces, or hyphens.")
-
-    if data["gender"] == "Select":
-        errors.append("• Please select a Gender.")
-
-    if data["year"] == "Select":
-        errors.append("• Please select a Year Level.")
-
-    if data["college"] == "Select":
-        errors.append("• Please select a College.")
-
-    if data["program"] == "Select":
-        errors.append("• Please select a Program.")
-
-    return errors
-
-def load_college_data(college_file="college.csv", program_file="program.csv"):
-    college_data = {}
-
-    # Load colleges
-    try:
-        with open(college_file, newline='', encoding="utf-8") as cfile:
-            reader = csv.DictReader(cfile)
-            for row in reader:
-                college_name = row["College Name"].strip()
-                college_code = row["College Code"].strip()
-                if college_name and college_code:
-                    college_data[college_name] = {
-                        "code": college_code,
-                        "programs": {}
-                    }
-    except Exception as e:
-        messagebox.showerror("Error", f"Failed to load colleges: {e}")
-        return {}
-
-    # Load programs
-    try:
-        with open(program_file, newline='', encoding="utf-8") as pfile:
-            reader = csv.DictReader(pfile)
-            for row in reader:
-                college_name = row["College Name"].strip()
-                program_name = row["Program Name"].strip()
-                program_code = row["Program Code"].strip()
-                if college_name in college_data and program_name and program_code:
-                    college_data[college_name]["programs"][program_name] = program_code
-    except Exception as e:
-        messagebox.showerror("Error", f"Failed to load programs: {e}")
-
-    return college_data
-
-
-def on_input_change(cancel_butt, *args):
-    if search_var.get():
-        cancel_butt.grid()
-    else:
-        cancel_butt.grid_remove()
-    filter_students()
+    set_filter_choices(college=colleges, program=load_programs("All Colleges"))
 
+def load_college_data():
+    # College name -> {"code", "programs": {name: code}} for the student forms
+    return {college["name"]: college for college in catalog.college_programs().values()}
 
 
 def clear_placeholder(event=None):
@@ -273,35 +104,18 @@ def on_select(event):
         
         college_code = selected_college.split(" - ")[0]
 
-        program_names = []
-        if os.path.exists(PROGRAM_FILE):
-            with open(PROGRAM_FILE, mode='r', newline='', encoding='utf-8') as file:
-                reader = csv.reader(file)
-                for row in reader:
-                    if len(row) == 3 and row[2] == college_code:  
-                        program_names.append(f"{row[0]} - {row[1]}") 
+        college = catalog.college_programs().get(college_code)
+        program_names = [f"{name} - {code}" for name, code in college["programs"].items()] if college else []
 
         program_filter["values"] = program_names if program_names else ["No programs available"]
         program_filter.set("Select")
 
 def update_summary():
-    # Students
-    total_students = 0
-    if os.path.exists(STUDENT_CSV):
-        with open(STUDENT_CSV, newline='', encoding='utf-8') as file:
-            total_students = sum(1 for _ in csv.DictReader(file))
-
-    # Colleges
-    total_colleges = 0
-    if os.path.exists(COLLEGE_CSV):
-        with open(COLLEGE_CSV, newline='', encoding='utf-8') as file:
-            total_colleges = sum(1 for _ in csv.DictReader(file))
-
-    # Programs
-    total_programs = 0
-    if os.path.exists(PROGRAM_CSV):
-        with open(PROGRAM_CSV, newline='', encoding='utf-8') as file:
-            total_programs = sum(1 for _ in csv.DictReader(file))
+    # Colleges, programs and students (re-read only if the files changed on disk)
+    app_data.refresh()
+    total_colleges = len(catalog.colleges)
+    total_programs = len(catalog.programs)
+    total_students = len(student_repo)
 
     # Update labels
     total_colleges_label.config(text=f"Total Colleges: {total_colleges}")
@@ -309,9 +123,10 @@ def update_summary():
     total_students_label.config(text=f"Total Students: {total_students}")
 
 def delete_student(event=None):
-    global students
-
     selected_item = student_tbl.selection()
+    student_ids = selected_student_ids()
+    if len(student_ids) > 1:
+        return delete_selected_students(student_ids)
     if not selected_item:
         messagebox.showwarning("No Selection", "Please select a student to delete.")
         return
@@ -323,40 +138,110 @@ def delete_student(event=None):
     if not confirm:
         return
 
-    # Update the CSV
-    updated_rows = []
-    with open("students.csv", "r", newline="", encoding="utf-8") as file:
-        reader = csv.reader(file)
-        header = next(reader)
-        for row in reader:
-            if row and row[0] != student_id:
-                updated_rows.append(row)
-
-    with open("students.csv", "w", newline="", encoding="utf-8") as file:
-        writer = csv.writer(file)
-        writer.writerow(header)
-        writer.writerows(updated_rows)
-
-    # Re-load students and refresh view
-    students = load_students()
+    student_repo.delete(student_id)
+
+    # Refresh view
     refresh_students()         # Re-applies filters and updates table
-    update_summary()           # Now accurately reflects the updated CSV
+    update_summary()           # Now accurately reflects the repository
 
     messagebox.showinfo("Success", f"Student ID {student_id} has been deleted!")
 
 
-def display_students():
-    global current_page, students_per_page
+def selected_student_ids():
+    # Multi-selection in table order, including rows scrolled out of view
+    return [s.student_id for s in student_table.rows if s.student_id in student_table.selected]
+
+def delete_selected_students(student_ids):
+    confirm = messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete the {len(student_ids)} selected students?")
+    if not confirm:
+        return
 
-    start_index = current_page * students_per_page
-    end_index = start_index + students_per_page
+    # One batch: a single storage write and a single table refresh
+    student_repo.delete_many(student_ids)
+    student_table.selected = set()
 
-    student_tbl.delete(*student_tbl.get_children())
-    for student in display_students.current_students[start_index:end_index]:
-        student_tbl.insert('', 'end', values=[
-            student['Student ID'], student['Last Name'], student['First Name'], student['Gender'],
-            student['College'], student['College Code'], student['Program'], student['Program Code'], student['Year']
-        ])
+    refresh_students()
+    update_summary()
+
+    messagebox.showinfo("Success", f"{len(student_ids)} students have been deleted!")
+
+def bulk_edit_students(student_ids):
+    # Year level and/or college + program for every selected student,
+    # applied as one batch
+    keep = "No change"
+    year_var = tk.StringVar(value=keep)
+    college_var = tk.StringVar(value=keep)
+    program_var = tk.StringVar(value=keep)
+
+    bulkroot = Toplevel()
+    bulkroot.grab_set()
+    bulkroot.title(f"Edit {len(student_ids)} Students")
+    bulkroot.geometry("470x300+220+200")
+    bulkroot.config(bg='lightgrey')
+    bulkroot.resizable(False, False)
+
+    def update_program_list(event=None):
+        college = next((c for c in catalog.colleges if c.name == college_var.get()), None)
+        if college is None:
+            program_combo['values'] = [keep]
+        else:
+            program_combo['values'] = [p.name for p in catalog.program_counts.rows(college)] + ["N/A"]
+        program_var.set(keep)
+
+    def save_bulk_edit():
+        year = year_var.get()
+        college = next((c for c in catalog.colleges if c.name == college_var.get()), None)
+        program = None
+        if college is not None:
+            if program_var.get() == "N/A":
+                program = catalog.program_ref('N/A', 'N/A')
+            else:
+                program = next((p for p in catalog.program_counts.rows(college) if p.name == program_var.get()), None)
+            if program is None:
+                messagebox.showerror("Form Error", "• Please select a Program in the new College.")
+                return
+        if year == keep and college is None:
+            messagebox.showerror("Form Error", "• Nothing to change.")
+            return
+
+        confirm = messagebox.askyesno("Confirm Update", f"Update the {len(student_ids)} selected students?")
+        if not confirm:
+            return
+
+        students = []
+        for student_id in student_ids:
+            old = student_repo.get(student_id)
+            students.append(StudentRecord(old.student_id, old.last_name, old.first_name, old.gender,
+                                          old.year if year == keep else year,
+                                          college or old.college, program or old.program))
+        student_repo.update_many(students)
+
+        messagebox.showinfo("Success", f"{len(students)} students updated!")
+        refresh_students()
+        update_summary()
+        bulkroot.destroy()
+
+    row_i = 0
+    def row(label, widget):
+        nonlocal row_i
+        tk.Label(bulkroot, text=label, font=('times', 17, 'bold'), bg="lightgrey").grid(row=row_i, column=0, padx=5, pady=5)
+        widget.grid(row=row_i, column=1, padx=5, pady=5)
+        row_i += 1
+
+    row("Year", ttk.Combobox(bulkroot, font=("times", 17), state="readonly", textvariable=year_var, values=[keep, "1", "2", "3", "4"]))
+    college_combo = ttk.Combobox(bulkroot, font=("times", 17), state="readonly", textvariable=college_var,
+                                 values=[keep] + [c.name for c in catalog.colleges])
+    college_combo.bind("<<ComboboxSelected>>", update_program_list)
+    row("College", college_combo)
+    program_combo = ttk.Combobox(bulkroot, font=("times", 17), state="readonly", textvariable=program_var, values=[keep])
+    row("Program", program_combo)
+
+    tk.Button(bulkroot, text="Update", command=save_bulk_edit, font=("Arial", 13), width=18, bg="lightgrey").place(x=50, y=230)
+    tk.Button(bulkroot, text="Cancel", command=bulkroot.destroy, font=("Arial", 13), width=18, bg="lightgrey").place(x=250, y=230)
+
+def display_students():
+    # The virtual table pages through the rows itself as the user scrolls
+    student_table.set_rows(display_students.current_students)
 
 
 # --- Initialize required attributes
@@ -367,8 +252,10 @@ display_students.current_students = []
 
 def update_student():
     global students, current_page, total_pages, students_per_page, college_data
-    college_data = load_college_data(CSV_COLLEGES, CSV_PROGRAMS)
-    file_path = "students.csv"
+    student_ids = selected_student_ids()
+    if len(student_ids) > 1:
+        return bulk_edit_students(student_ids)
+    college_data = load_college_data()
 
     selected_item = student_tbl.focus()
     if not selected_item:
@@ -446,13 +333,8 @@ def update_student():
             errors.append("• Please select a valid Program.")
 
         # ✅ Check for duplicate only if new ID is different from old ID
-        with open("students.csv", "r", newline="", encoding="utf-8") as file:
-            reader = csv.reader(file)
-            headers = next(reader)
-            for row in reader:
-                if row and row[0] == new_id and new_id != old_id:
-                    errors.append(f"• A student with ID {new_id} already exists.")
-                    break
+        if new_id != old_id and new_id in student_repo:
+            errors.append(f"• A student with ID {new_id} already exists.")
 
         if errors:
             messagebox.showerror("Form Error", "\n".join(errors))
@@ -462,29 +344,17 @@ def update_student():
         if not confirm:
             return
 
-        updated_rows = []
-        with open("students.csv", "r", newline="", encoding="utf-8") as file:
-            reader = csv.reader(file)
-            headers = next(reader)
-            for row in reader:
-                if row and row[0] != old_id:
-                    updated_rows.append(row)
-
         if program == "N/A":
             program_code = "N/A"
 
-        updated_rows.append([
+        student_repo.update(old_id, make_student(
             new_id, last_name, first_name, gender,
             college, college_code, program, program_code, year
-        ])
-
-        with open("students.csv", "w", newline="", encoding="utf-8") as file:
-            writer = csv.writer(file)
-            writer.writerow(headers)
-            writer.writerows(updated_rows)
+        ))
 
         messagebox.showinfo("Success", "Student information updated!")
-        refresh_table()
+        refresh_students()
+        update_summary()
         upgroot.destroy()
 
     # UI Layout
@@ -520,8 +390,7 @@ def update_student():
 
 def register_student():
     global students, current_page, total_pages, students_per_page, college_data
-    college_data = load_college_data(CSV_COLLEGES, CSV_PROGRAMS)
-    file_path = "students.csv"
+    college_data = load_college_data()
 
     id_var = tk.StringVar()
     lastname_var = tk.StringVar()
@@ -557,10 +426,6 @@ def register_student():
             program_combo["values"] = []
             college_code_var.set("")
             program_code_var.set("")
-        update_summary()
-        refresh_filter_dropdowns()
-        refresh_table()
-        regroot.destroy()
 
     def save_register():
         new_id = id_var.get().strip()
@@ -593,13 +458,8 @@ def register_student():
             errors.append("• Please select a valid Program.")
 
         # ✅ Check if ID already exists
-        with open(file_path, "r", newline="", encoding="utf-8") as file:
-            reader = csv.reader(file)
-            headers = next(reader)
-            for row in reader:
-                if row and row[0] == new_id:
-                    errors.append(f"• A student with ID {new_id} already exists.")
-                    break
+        if new_id in student_repo:
+            errors.append(f"• A student with ID {new_id} already exists.")
 
         if errors:
             messagebox.showerror("Form Error", "\n".join(errors))
@@ -612,17 +472,15 @@ def register_student():
         if program == "N/A":
             program_code = "N/A"
 
-        with open(file_path, "a", newline="", encoding="utf-8") as file:
-            writer = csv.writer(file)
-            writer.writerow([
-                new_id, last_name, first_name, gender,
-                college, college_code, program, program_code, year
-            ])
+        student_repo.add(make_student(
+            new_id, last_name, first_name, gender,
+            college, college_code, program, program_code, year
+        ))
 
         messagebox.showinfo("Success", "New student registered successfully!")
         update_summary()
         refresh_filter_dropdowns()
-        refresh_table()
+        refresh_students()
         regroot.destroy()
 
     # UI Layout
@@ -669,34 +527,12 @@ def load_colleges(return_list=False):
 
     college_list = ["All Colleges"] if return_list else []
 
-    file_path = CSV_COLLEGES if os.path.exists(CSV_COLLEGES) else COLLEGE_FILE
-
-    if not os.path.exists(file_path):
-        return college_list if return_list else None
-
-    try:
-        with open(file_path, newline='', encoding="utf-8") as file:
-            reader = csv.DictReader(file) if file_path == CSV_COLLEGES else csv.reader(file)
-
-            for row in reader:
-                if isinstance(row, dict):
-                    # DictReader expected fields: "College Code", "College Name"
-                    code = row.get("College Code", "").strip()
-                    name = row.get("College Name", "").strip()
-                else:
-                    if len(row) != 2:
-                        continue
-                    code, name = row[0].strip(), row[1].strip()
-
-                if code and name:
-                    formatted = f"{code} - {name}"
-                    college_names[formatted] = []
-                    if return_list:
-                        college_list.append(name)
-
-    except Exception as e:
-        messagebox.showerror("Load Error", f"Error loading colleges: {e}")
-        print(f"Error loading colleges: {e}")
+    # From the shared catalog, which the DataWatcher keeps current
+    for college in catalog.colleges:
+        formatted = f"{college.code} - {college.name}"
+        college_names[formatted] = []
+        if return_list:
+            college_list.append(college.name)
 
     return college_list if return_list else None
 
@@ -722,309 +558,64 @@ def on_root_resize(event):
 
 
 def load_data():
-    students = load_students()
-    
     if not os.path.exists(CSV_STUDENTS):
-        with open(CSV_STUDENTS, "w", newline="") as file:
-            writer = csv.writer(file)
-            writer.writerow(["Student ID", "Last Name", "First Name", "Gender", "College", "College Code", "Program", "Program Code", "Year"])
-    else:
-        with open(CSV_STUDENTS, "r") as file:
-            reader = csv.reader(file)
-            next(reader, None)  
-            for row in reader:
-                student_tbl.insert("", "end", values=row)
-
-def update_csv_from_table():
-    try:
-        with open(CSV_STUDENTS, "r", newline="") as file:
-            reader = csv.DictReader(file)
-            all_students = list(reader)
-    except FileNotFoundError:
-        messagebox.showerror("File Error", f"The '{CSV_STUDENTS}' file was not found.")
-        return
-
-    students_dict = {student["Student ID"]: student for student in all_students}
-
-    for row in student_tbl.get_children():
-        values = student_tbl.item(row)['values']
-        updated_student = {
-            "Student ID": values[0],
-            "Last Name": values[1],
-            "First Name": values[2],
-            "Gender": values[3],
-            "College": values[4],
-            "College Code": values[5],
-            "Program": values[6],
-            "Program Code": values[7],
-            "Year": values[8]
-        }
-        students_dict[updated_student["Student ID"]] = updated_student
-
-    with open(CSV_STUDENTS, "w", newline="") as file:
-        fieldnames = ["Student ID", "Last Name", "First Name", "Gender", "College",
-                      "College Code", "Program", "Program Code", "Year"]
-        writer = csv.DictWriter(file, fieldnames=fieldnames)
-        writer.writeheader()
-        for student in sorted(students_dict.values(), key=lambda x: (x["Last Name"].lower(), x["First Name"].lower())):
-            writer.writerow(student)
-
-    for item in student_tbl.get_children():
-        student_tbl.delete(item)
-    load_data()
-
-    messagebox.showinfo("Update Success", "Student records updated successfully.")
+        write_csv(CSV_STUDENTS, STUDENT_FIELDS, [])
+    student_table.set_rows(load_students())
 
 def load_programs(college):
     programs = ["All Programs"]
     seen = set()
 
-    if os.path.exists(CSV_PROGRAMS):
-        with open(CSV_PROGRAMS, newline="") as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                if college == "All Colleges" or row["College Name"] == college:
-                    name = row["Program Name"]
-                    if name not in seen:
-                        programs.append(name)
-                        seen.add(name)
-
-    if os.path.exists(CSV_STUDENTS):
-        with open(CSV_STUDENTS, newline="") as file:
-            for row in csv.DictReader(file):
-                if row["Program"] == "N/A" and "N/A" not in programs:
-                    programs.append("N/A")
-                    break
+    if college == "All Colleges":
+        names = (program.name for program in catalog.programs)
+    else:
+        names = (name for entry in catalog.college_programs().values() if entry["name"] == college
+                 for name in entry["programs"])
+    for name in names:
+        if name not in seen:
+            programs.append(name)
+            seen.add(name)
+
+    # Students per program are counted as they change; no scan needed
+    if "N/A" not in seen and any(program.name == "N/A" for program in students_by_program.counts):
+        programs.append("N/A")
 
     return programs
 
-def load_filtered_students(college_filter, program_filter, sort_option):
-    students = []
-    if os.path.exists(CSV_STUDENTS):
-        with open(CSV_STUDENTS, newline="") as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                if (college_filter == "All Colleges" or row["College"] == college_filter) and                    (program_filter == "All Programs" or row["Program"] == program_filter):
-                    students.append(row)
-
-    def sort_key(student):
-        gender_priority = 0 if student["Gender"].lower() == "female" else 1
-        year_priority_map = {"4": 1, "3": 2, "2": 3, "1": 4}
-        year_priority = year_priority_map.get(student["Year"], 5)
-        lname = student["Last Name"].lower()
-        fname = student["First Name"].lower()
-
-        if sort_option == "First Name A-Z":
-            return (fname,)
-        elif sort_option == "First Name Z-A":
-            return (fname,)
-        elif sort_option == "Last Name A-Z":
-            return (lname,)
-        elif sort_option == "Last Name Z-A":
-            return(lname,)
-        elif sort_option == "Gender":
-            return (gender_priority, lname, fname)
-        elif sort_option == "Year":
-            return (year_priority, lname, fname)
-        else: 
-            return (lname,)
-
-    reverse = sort_option in ["First Name Z-A", "Last Name Z-A"]
-    students.sort(key=sort_key, reverse=reverse)
-    return students
+def load_filtered_students(college_filter, program_filter, gender_filter, year_filter, sort_option, student_ids=None):
+    # student_ids optionally narrows the candidates (e.g. search index matches)
+    return student_repo.query(college_filter, program_filter, gender_filter, sort_option, student_ids,
+                              year=year_filter)
+
 def show_all():
-    for row in student_tbl.get_children():
-        student_tbl.delete(row)
+    student_repo.load()
     load_data()
 
 
 def exit_student():
     res = messagebox.askyesnocancel('Notification','Do you want to exit?')
     if(res == True):
+        data_watcher.stop()
+        # Students still loading are only partly in memory; their storage
+        # is left alone and read again on the next start
+        if not app_data.loading:
+            student_repo.close()
         win.destroy()
     
     
-COLLEGE_CSV = 'colleges.csv'
-PROGRAM_CSV = 'programs.csv'
-STUDENT_CSV = 'students.csv'
-
-def read_csv(file_path):
-    try:
-        with open(file_path, newline='', encoding='utf-8') as f:
-            return list(csv.DictReader(f))
-    except FileNotFoundError:
-        return []
-
-def write_csv(file_path, fieldnames, data):
-    with open(file_path, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(data)
-
-class CollegeManagerLogic:
-    def __init__(self, college_file=COLLEGE_CSV, student_file=STUDENT_CSV):
-        self.college_file = college_file
-        self.student_file = student_file
-        
-    def refresh_table(self):
-        self.tree.delete(*self.tree.get_children())  # Clear table
-        colleges = self.manager.get_all_colleges()
-        for college in colleges:
-            self.tree.insert('', 'end', values=(college["College Name"], college["College Code"], college["Programs"], college["Students"]))
-
-    def get_colleges(self):
-        return read_csv(self.college_file)
-
-    def backup_csv(self, filename='colleges.csv'):
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        backup_dir = 'backups'
-        os.makedirs(backup_dir, exist_ok=True)
-        backup_filename = os.path.join(backup_dir, f'colleges_backup_{timestamp}.csv')
-        shutil.copy(filename, backup_filename)
-
-    def get_all_colleges(self):
-        colleges = []
-        try:
-            with open(self.college_file, newline='', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
-                for row in reader:
-                    code = row['College Code'].strip()
-                    colleges.append({
-                        'College Name': row['College Name'].strip(),
-                        'College Code': code,
-                        'Programs': self.count_programs_by_college(code),
-                        'Students': self.count_students_by_college(code)
-                    })
-        except FileNotFoundError:
-            pass
-        return colleges
-
-    def count_programs_by_college(self, college_code):
-        college_code = college_code.strip().lower()
-        programs = read_csv(PROGRAM_CSV)
-        return sum(1 for p in programs if p['College Code'].strip().lower() == college_code)
-
-    def count_students_by_college(self, college_code):
-        college_code = college_code.strip().lower()
-        students = read_csv(STUDENT_CSV)
-        return sum(1 for s in students if s['College Code'].strip().lower() == college_code)
-
-    def add_college(self, name, code):
-        name, code = name.strip(), code.strip()
-        colleges = self.get_colleges()
-        for c in colleges:
-            if c['College Name'].strip().lower() == name.lower() or c['College Code'].strip().lower() == code.lower():
-                raise ValueError("College with this name or code already exists.")
-        colleges.append({'College Name': name, 'College Code': code})
-        filtered = [{'College Name': c['College Name'], 'College Code': c['College Code']} for c in colleges]
-        write_csv(self.college_file, ['College Name', 'College Code'], filtered)
-
-
-    def edit_college(self, old_code, new_name, new_code):
-        new_name, new_code = new_name.strip(), new_code.strip()
-        colleges = self.get_colleges()
-        if old_code != new_code and any(c['College Code'].strip().lower() == new_code.lower() for c in colleges):
-            raise ValueError(f"A college with code '{new_code}' already exists.")
-        found = False
-        for c in colleges:
-            if c['College Code'].strip().lower() == old_code.strip().lower():
-                c['College Name'] = new_name
-                c['College Code'] = new_code
-                found = True
-                break
-        if not found:
-            raise ValueError(f"College with code '{old_code}' not found.")
-        filtered = [{'College Name': c['College Name'], 'College Code': c['College Code']} for c in colleges]
-        write_csv(self.college_file, ['College Name', 'College Code'], filtered)
-
-
-        if old_code != new_code:
-            students = read_csv(self.student_file)
-            updated = False
-            for s in students:
-                if s['College Code'].strip().lower() == old_code.strip().lower():
-                    s['College Code'] = new_code
-                    s['College'] = new_name
-                    updated = True
-            if updated and students:
-                write_csv(self.student_file, students[0].keys(), students)
-                    
-    def update_college(self, old_name, old_code, new_name, new_code):
-        colleges = read_csv(self.college_file)
-
-        # Check for duplicate (only if name or code is changing)
-        for college in colleges:
-            if (college['College Name'] == new_name and college['College Code'] == new_code and 
-                (new_name != old_name or new_code != old_code)):
-                raise ValueError("A college with the same name and code already exists.")
-
-        updated = False
-        for college in colleges:
-            if college['College Name'] == old_name and college['College Code'] == old_code:
-                college['College Name'] = new_name
-                college['College Code'] = new_code
-                updated = True
-                break
-
-        if not updated:
-            raise ValueError("College not found for update.")
-
-        write_csv(self.college_file, ["College Name", "College Code"], colleges)
-
-        # Update college name/code in programs and students
-        self._update_college_name_in_programs(old_name, new_name)
-        self._update_college_name_in_students(old_name, new_name)
-
-
-    def _update_college_name_in_programs(self, old_name, new_name):
-        programs = read_csv(PROGRAM_CSV)
-        for program in programs:
-            if program['College Name'] == old_name:
-                program['College Name'] = new_name
-        if programs:
-            write_csv(PROGRAM_CSV, programs[0].keys(), programs)
+def make_student(student_id, last_name, first_name, gender, college, college_code, program, program_code, year):
+    return StudentRecord.from_row(dict(zip(STUDENT_FIELDS, [student_id, last_name, first_name, gender,
+                                                            college, college_code, program, program_code, year])),
+                                  catalog)
 
-
-    def _update_college_name_in_students(self, old_name, new_name):
-        students = read_csv(self.student_file)
-        for student in students:
-            if student['College'] == old_name:
-                student['College'] = new_name
-        if students:
-            write_csv(self.student_file, students[0].keys(), students)
-
-    def delete_college(self, college_code):
-        college_code = college_code.strip()
-        colleges = self.get_colleges()
-        college = next((c for c in colleges if c['College Code'].strip() == college_code), None)
-        if not college:
-            raise ValueError("College not found.")
-        
-        # Remove the college from the college list
-        updated_colleges = [c for c in colleges if c['College Code'].strip() != college_code]
-        write_csv(self.college_file, ['College Name', 'College Code'], updated_colleges)
-
-        # Update students
-        students = read_csv(self.student_file)
-        updated_students = False
-        for s in students:
-            if s.get('College Code', '').strip() == college_code:
-                s['College'] = 'N/A'
-                s['College Code'] = 'N/A'
-                updated_students = True
-        if updated_students and students:
-            write_csv(self.student_file, students[0].keys(), students)
-
-        # ✅ Update programs
-        programs = read_csv(PROGRAM_CSV)
-        updated_programs = False
-        for p in programs:
-            if p.get('College Code', '').strip() == college_code:
-                p['College Name'] = 'N/A'
-                p['College Code'] = 'N/A'
-                updated_programs = True
-        if updated_programs and programs:
-            write_csv(PROGRAM_CSV, programs[0].keys(), programs)
+# Finish a multi-file write interrupted by a crash, then read the catalog;
+# the students are filled in by the BackgroundLoader once the window is up
+app_data = open_data(preload=False)
+catalog = app_data.catalog
+student_repo = app_data.repo
+search_index = app_data.search_index
+students_by_college = app_data.students_by_college
+students_by_program = app_data.students_by_program
 
 
 class CollegeManagerWindow(tk.Toplevel):
@@ -1032,7 +623,7 @@ class CollegeManagerWindow(tk.Toplevel):
         super().__init__(master)
         self.title("College Manager")
         self.geometry("900x500") 
-        self.logic = CollegeManagerLogic()
+        self.logic = CollegeManagerLogic(app_data)
         self.create_widgets()
         self.load_colleges()
     
@@ -1117,10 +708,11 @@ class CollegeManagerWindow(tk.Toplevel):
             return
 
         try:
-            self.logic.delete_college(college_code)
+            counts = self.logic.delete_college(college_code)
             self.load_colleges()  
 
-            messagebox.showinfo("Deleted", "College deleted successfully. Students' college info updated to 'N/A'.")
+            messagebox.showinfo("Deleted", f"College deleted successfully. {counts['programs']} program(s) and "
+                                           f"{counts['students']} student(s) updated to 'N/A'.")
         except Exception as e:
             messagebox.showerror("Error", str(e))
         refresh_students()
@@ -1168,9 +760,10 @@ class CollegeManagerWindow(tk.Toplevel):
                 return
 
             try:
-                self.logic.update_college(original_name, original_code, new_name, new_code)
+                counts = self.logic.update_college(original_name, original_code, new_name, new_code)
                 self.load_colleges()
-                messagebox.showinfo("Success", "College updated successfully.")
+                messagebox.showinfo("Success", f"College updated successfully. {counts['programs']} program(s) and "
+                                               f"{counts['students']} student(s) affected.")
             except Exception as e:
                 messagebox.showerror("Error", str(e))
 
@@ -1284,185 +877,6 @@ class CollegeManagerWindow(tk.Toplevel):
 
 
 
-class ProgramManagerLogic:
-    def __init__(self):
-        self.programs = []
-        self.colleges = []
-        self.students = []
-        self.load_data()
-
-    def load_data(self):
-        self.programs = []
-        self.colleges = []
-        self.students = []
-
-        # Load colleges
-        try:
-            with open(COLLEGE_CSV, newline='', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    self.colleges.append(row)
-        except FileNotFoundError:
-            pass
-
-        # Load programs
-        try:
-            with open(PROGRAM_CSV, newline='', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    self.programs.append(row)
-        except FileNotFoundError:
-            pass
-
-        # Load students
-        try:
-            with open(STUDENT_CSV, newline='', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    self.students.append(row)
-        except FileNotFoundError:
-            pass
-
-    def save_programs(self):
-        with open(PROGRAM_CSV, 'w', newline='', encoding='utf-8') as f:
-            fieldnames = ['Program Name', 'Program Code', 'College Name', 'College Code']
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            for p in self.programs:
-                writer.writerow(p)
-
-    def get_programs(self, filter_text=""):
-        # Returns list of program dicts filtered by program name, code or college name
-        filter_text = filter_text.lower()
-        filtered = []
-        for p in self.programs:
-            if (filter_text in p['Program Name'].lower() or
-                filter_text in p['Program Code'].lower() or
-                filter_text in p['College Name'].lower()):
-                filtered.append(p)
-        filtered.sort(key=lambda p: p['Program Name'].lower())
-        
-        return filtered
-
-    def get_college_names(self):
-        return [c['College Name'] for c in self.colleges]
-
-    def count_students_in_program(self, program_code):
-        count = 0
-        for s in self.students:
-            if s.get('Program Code', '') == program_code:
-                count += 1
-        return count
-
-    def total_students_in_programs(self):
-        # Sum of students assigned to any program (Program Code != '')
-        count = 0
-        for s in self.students:
-            if s.get('Program Code', '').strip() != '':
-                count += 1
-        return count
-
-    def total_programs(self):
-        return len(self.programs)
-
-    def is_duplicate_program(self, program_name, program_code, exclude_index=None):
-        for i, p in enumerate(self.programs):
-            if exclude_index is not None and i == exclude_index:
-                continue
-            if p['Program Name'].lower() == program_name.lower() or p['Program Code'].lower() == program_code.lower():
-                return True
-        return False
-
-    def add_program(self, college_name, program_name, program_code):
-        # Validate inputs
-        if not college_name or not program_name or not program_code:
-            return False, "All fields must be filled."
-        # Check college exists
-        college = next((c for c in self.colleges if c['College Name'] == college_name), None)
-        if not college:
-            return False, "Selected college does not exist."
-        # Check duplicates
-        if self.is_duplicate_program(program_name, program_code):
-            return False, "Program name or code already exists."
-
-        new_program = {
-            'Program Name': program_name.strip(),
-            'Program Code': program_code.strip(),
-            'College Name': college_name,
-            'College Code': college['College Code']
-        }
-        self.programs.append(new_program)
-        self.save_programs()
-        refresh_filter_dropdowns()
-        refresh_students()      
-        update_summary()           
-
-        return True, "Program added successfully."
-
-    def update_program(self, index, college_name, program_name, program_code):
-        if index < 0 or index >= len(self.programs):
-            return False, "Invalid program selected."
-        if not college_name or not program_name or not program_code:
-            return False, "All fields must be filled."
-        college = next((c for c in self.colleges if c['College Name'] == college_name), None)
-        if not college:
-            return False, "Selected college does not exist."
-        if self.is_duplicate_program(program_name, program_code, exclude_index=index):
-            return False, "Program name or code already exists."
-
-        old_program = self.programs[index]
-        old_program_code = old_program['Program Code']
-        self.programs[index] = {
-            'Program Name': program_name.strip(),
-            'Program Code': program_code.strip(),
-            'College Name': college_name,
-            'College Code': college['College Code']
-        }
-        self.save_programs()
-
-        if old_program_code != program_code.strip():
-            for s in self.students:
-                if s.get('Program Code', '') == old_program_code:
-                    s['Program Code'] = program_code.strip()
-            self.save_students()
-        
-        refresh_filter_dropdowns()
-        refresh_students()         
-        update_summary()           
-        return True, "Program updated successfully."
-
-    def save_students(self):
-        if not self.students:
-            return
-        with open(STUDENT_CSV, 'w', newline='', encoding='utf-8') as f:
-            fieldnames = list(self.students[0].keys())
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            for s in self.students:
-                writer.writerow(s)
-
-    def delete_program(self, index):
-        if index < 0 or index >= len(self.programs):
-            return False, "Invalid program selected."
-
-        program_to_delete = self.programs[index]
-        program_code = program_to_delete['Program Code']
-
-        # Remove program from programs list
-        self.programs.pop(index)
-        self.save_programs()
-
-        # For students assigned to this program, set Program and Program Code to 'N/A'
-        for s in self.students:
-            if s.get('Program Code', '') == program_code:
-                s['Program'] = 'N/A'
-                s['Program Code'] = 'N/A'
-        self.save_students()
-        refresh_filter_dropdowns()
-        refresh_students()      
-        update_summary()           
-        return True, "Program deleted successfully."
-    
 class ProgramManagerWindow(tk.Toplevel):
     def __init__(self, master=None):
         super().__init__(master)
@@ -1470,7 +884,7 @@ class ProgramManagerWindow(tk.Toplevel):
         self.geometry("900x500")
         self.resizable(False, False)
 
-        self.logic = ProgramManagerLogic()
+        self.logic = ProgramManagerLogic(app_data)
 
         # Search Frame
         self.search_frame = tk.Frame(self)
@@ -1571,9 +985,11 @@ class ProgramManagerWindow(tk.Toplevel):
         for row in self.tree.get_children():
             self.tree.delete(row)
 
-        for i, p in enumerate(programs):
+        for p in programs:
             count_students = self.logic.count_students_in_program(p['Program Code'])
-            self.tree.insert('', 'end', iid=i, values=(
+            # iid is the position in logic.programs, which the update/delete
+            # handlers index with (not the position in this filtered list)
+            self.tree.insert('', 'end', iid=self.logic.programs.index(p), values=(
                 p['Program Name'],
                 p['Program Code'],
                 p['College Name'],
@@ -1718,7 +1134,7 @@ college_btn = tk.Button(
 )
 college_btn.place(x=50, y=650, width=150, height=40)
 
-tk.Button(
+program_btn = tk.Button(
     win,
     text="Program",
     font=('Arial', 15, 'bold'),
@@ -1728,53 +1144,24 @@ tk.Button(
     relief=tk.GROOVE,
     activeforeground='white',
     command=open_program_manager
-).place(x=320, y=650, width=150, height=40)
+)
+program_btn.place(x=320, y=650, width=150, height=40)
 
 def load_students():
-    students = []
-    if os.path.exists("students.csv"):
-        with open("students.csv", newline="", encoding="utf-8") as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                students.append(row)
-    return students
+    return student_repo.all()
 
 def refresh_students():
-    global students
-    student_tbl.delete(*student_tbl.get_children())
-
-    college_filter = college_filter_var.get()
-    program_filter = program_filter_var.get()
-    gender_filter = gender_filter_var.get()
+    college_filter = filter_value('college')
+    program_filter = filter_value('program')
+    gender_filter = filter_value('gender')
+    year_filter = filter_value('year')
     sort_option = sort_by_var.get()
 
 
-    students = load_students()
-
-    if college_filter != "All Colleges":
-        students = [s for s in students if s["College"] == college_filter]
-    if program_filter != "All Programs":
-        students = [s for s in students if s["Program"] == program_filter]
-    if gender_filter != "All Genders":
-        students = [s for s in students if s["Gender"] == gender_filter]
-
-
-
-    reverse = "Desc" in sort_option
-    if "First Name" in sort_option:
-        students.sort(key=lambda s: s["First Name"].lower(), reverse=reverse)
-    elif "Last Name" in sort_option:
-        students.sort(key=lambda s: s["Last Name"].lower(), reverse=reverse)
-    elif "Year" in sort_option:
-        students.sort(key=lambda s: int(s["Year"]), reverse=reverse)
-    elif "Gender" in sort_option:
-        students.sort(key=lambda s: s["Gender"].lower(), reverse=reverse)
-
-    for s in students:
-        student_tbl.insert('', 'end', values=[
-            s['Student ID'], s['Last Name'], s['First Name'], s['Gender'],
-            s['College'], s['College Code'], s['Program'], s['Program Code'], s['Year']
-        ])
+    app_data.refresh()
+    student_table.set_rows(student_repo.query(college_filter, program_filter, gender_filter, sort_option,
+                                              year=year_filter))
+    update_filter_counts()
 
 search_var = tk.StringVar()
 search_frame = tk.LabelFrame(win, bd=3, relief=tk.SUNKEN, bg="#F3EBDF")
@@ -1782,7 +1169,7 @@ search_frame.place(x=665, y=10)
 
 search_entry = tk.Entry(search_frame, textvariable=search_var, bd=0, relief=tk.FLAT, font=("Arial", 20), width=40)
 search_entry.pack(side=tk.LEFT, fill=tk.BOTH, padx=(0, 5))
-search_entry.bind("<KeyRelease>", lambda event: search_students())
+search_var.trace_add("write", lambda *args: live_search.schedule())
 
 try:
     searchicon = tk.PhotoImage(file="searchicon.png")
@@ -1830,6 +1217,10 @@ delete_btn.place(x=870,y=650,width=150,height=40)
 
 exit_btn = tk.Button(text = "Exit",width=15,font=('Arial',18,'bold'),fg="#F3EBDF",bg='#6A1314',activebackground='blue',relief=tk.GROOVE,activeforeground='white',command=exit_student)
 exit_btn.place(x=1150,y=650,width=150,height=40)
+# Closing the window from its title bar goes through the same exit, so
+# the storage is still closed (journal folded into students.csv, or the
+# SQLite copy exported to it)
+win.protocol("WM_DELETE_WINDOW", exit_student)
 
 # --- Student Table Frame ---
 tree_frame = tk.Frame(win, bd=3, relief=tk.GROOVE)
@@ -1840,11 +1231,143 @@ columns = (
     "College", "College Code", "Program", "Program Code", "Year"
 )
 
+ROW_HEIGHT = 20
+VIRTUAL_BUFFER_ROWS = 5
+
+class VirtualTable:
+    # Shows a large result list in a Treeview by keeping only the rows in
+    # view (plus VIRTUAL_BUFFER_ROWS below the fold) as Treeview items. The
+    # scrollbar, mouse wheel and arrow/page keys move a window over self.rows
+    # and the items are swapped as it moves. Items use the Student ID as iid
+    # and each render only inserts, removes, moves or rewrites the rows that
+    # differ from what is already shown.
+    def __init__(self, tree, scrollbar, buffer=VIRTUAL_BUFFER_ROWS):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.buffer = buffer
+        self.rows = []
+        self.first = 0
+        self.page_size = max(1, (tree.winfo_height() - ROW_HEIGHT) // ROW_HEIGHT)
+        self.selected = set()
+        self.shown = {}
+
+        scrollbar.configure(command=self.yview)
+        tree.bind("<Configure>", self._on_resize)
+        tree.bind("<MouseWheel>", lambda e: self.scroll(-1 if e.delta > 0 else 1, "units"))
+        tree.bind("<Button-4>", lambda e: self.scroll(-1, "units"))
+        tree.bind("<Button-5>", lambda e: self.scroll(1, "units"))
+        for key in ("<Up>", "<Down>", "<Prior>", "<Next>", "<Home>", "<End>"):
+            tree.bind(key, self._on_key)
+        tree.bind("<Button-1>", self._on_click, add="+")
+        tree.bind("<<TreeviewSelect>>", self._on_select, add="+")
+
+    @staticmethod
+    def row_values(student):
+        return [student[field] for field in STUDENT_FIELDS]
+
+    def set_rows(self, rows, keep_position=True):
+        self.rows = rows
+        if not keep_position:
+            self.first = 0
+        self.render()
+
+    def render(self):
+        self.first = max(0, min(self.first, len(self.rows) - self.page_size))
+        window = self.rows[self.first:self.first + self.page_size + self.buffer]
+        wanted = {student['Student ID']: tuple(self.row_values(student)) for student in window}
+
+        removed = [iid for iid in self.shown if iid not in wanted]
+        if removed:
+            self.tree.delete(*removed)
+            for iid in removed:
+                del self.shown[iid]
+
+        order = [iid for iid in self.tree.get_children() if iid in self.shown]
+        for position, (iid, values) in enumerate(wanted.items()):
+            if iid not in self.shown:
+                self.tree.insert('', position, iid=iid, values=values)
+                order.insert(position, iid)
+            else:
+                if order[position] != iid:
+                    self.tree.move(iid, '', position)
+                    order.remove(iid)
+                    order.insert(position, iid)
+                if self.shown[iid] != values:
+                    self.tree.item(iid, values=values)
+            self.shown[iid] = values
+
+        reselect = tuple(iid for iid in wanted if iid in self.selected)
+        if reselect != self.tree.selection():
+            self.tree.selection_set(reselect)
+        self._update_scrollbar()
+
+    def _update_scrollbar(self):
+        total = len(self.rows)
+        if total <= self.page_size:
+            self.scrollbar.set(0, 1)
+        else:
+            self.scrollbar.set(self.first / total, min(1, (self.first + self.page_size) / total))
+
+    def yview(self, *args):
+        if args and args[0] == "moveto":
+            self.first = int(float(args[1]) * len(self.rows))
+            self.render()
+        elif args and args[0] == "scroll":
+            self.scroll(int(args[1]), args[2])
+
+    def scroll(self, amount, what="units"):
+        self.first += amount * (self.page_size if what == "pages" else 1)
+        self.render()
+        return "break"
+
+    def _on_resize(self, event):
+        page_size = max(1, (event.height - ROW_HEIGHT) // ROW_HEIGHT)
+        if page_size != self.page_size:
+            self.page_size = page_size
+            self.render()
+
+    def _on_key(self, event):
+        if not self.rows:
+            return "break"
+        children = self.tree.get_children()
+        focus = self.tree.focus()
+        position = self.first + (children.index(focus) if focus in children else 0)
+        target = {
+            "Up": position - 1,
+            "Down": position + 1,
+            "Prior": position - self.page_size,
+            "Next": position + self.page_size,
+            "Home": 0,
+            "End": len(self.rows) - 1,
+        }[event.keysym]
+        target = max(0, min(target, len(self.rows) - 1))
+        if target < self.first:
+            self.first = target
+        elif target >= self.first + self.page_size:
+            self.first = target - self.page_size + 1
+        iid = self.rows[target]['Student ID']
+        self.selected = {iid}
+        self.render()
+        self.tree.focus(iid)
+        return "break"
+
+    def _on_click(self, event):
+        # A plain click starts a new selection; Shift/Control extend it
+        if not event.state & 0x0005:
+            self.selected = set()
+
+    def _on_select(self, event=None):
+        # Rows scrolled out of view keep their selection
+        self.selected = (self.selected - self.shown.keys()) | set(self.tree.selection())
+
 student_tbl = ttk.Treeview(tree_frame, columns=columns, show='headings')
 for col in columns:
     student_tbl.heading(col, text=col)
     student_tbl.column(col, width=120)
+student_scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL)
+student_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 student_tbl.pack(fill=tk.BOTH, expand=True)
+student_table = VirtualTable(student_tbl, student_scrollbar)
 
 # --- Summary Frame (below table) ---
 summary_frame = tk.Frame(win, bg="#F3EBDF")
@@ -1860,23 +1383,162 @@ total_students_label = tk.Label(summary_frame, text="Total Students: 0", font=("
 total_students_label.pack(side=tk.LEFT, padx=20)
 
 
-def search_students(event=None):
-    query = search_var.get().strip().lower()
-    college = college_filter_var.get()
-    program = program_filter_var.get()
-    sort_option = sort_by_var.get()
+WATCH_INTERVAL_MS = 1000
+
+class DataWatcher:
+    # Picks up edits other programs make to the data files while the window
+    # is open (e.g. students.csv regenerated from the registrar export). A
+    # background thread polls the files' mtime/size/inode; when students.csv
+    # or its journal changed it re-reads them and diffs against memory by
+    # Student ID, so the Tk thread only applies the changed rows. Results
+    # come back through a queue the Tk thread drains with after().
+    def __init__(self, widget, data, on_change, interval=WATCH_INTERVAL_MS):
+        self.widget = widget
+        self.data = data
+        self.on_change = on_change
+        self.interval = interval
+        self.results = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.data.watched = True
+        self._thread.start()
+        self.widget.after(self.interval, self._drain)
+
+    def stop(self):
+        self._stop.set()
+        self.data.watched = False
+
+    def _run(self):
+        storage = self.data.repo.storage
+        while not self._stop.wait(self.interval / 1000):
+            try:
+                catalog_changed = self.data.catalog.changed_on_disk()
+                students = None
+                if hasattr(storage, 'read_external') and storage.changed_on_disk():
+                    base = storage.stamps
+                    stamps = storage.file_stamps()
+                    rows = storage.read_external()
+                    students = (base, stamps, diff_student_rows(self.data.repo.students, rows))
+            except (OSError, csv.Error):
+                continue
+            if catalog_changed or students is not None:
+                self.results.put((catalog_changed, students))
+                # Wait for the Tk thread so the same change is not diffed twice
+                self.results.join()
+
+    def _drain(self):
+        if self._stop.is_set():
+            return
+        try:
+            catalog_changed, students = self.results.get_nowait()
+        except queue.Empty:
+            catalog_changed, students = False, None
+        else:
+            self.results.task_done()
+        if catalog_changed:
+            self.data.catalog.refresh()
+        changed = 0
+        repo = self.data.repo
+        if students is not None:
+            base, stamps, (rows, deleted) = students
+            # Skipped if we wrote in the meantime; the next poll diffs again
+            if repo.storage.stamps == base:
+                repo.apply_external(rows, deleted)
+                repo.storage.stamps = stamps
+                changed = len(rows) + len(deleted)
+        elif not hasattr(repo.storage, 'read_external') and repo.storage.changed_on_disk():
+            # SQLite can only be queried from this thread; reload it whole
+            repo.load()
+            changed = len(repo)
+        if catalog_changed or changed:
+            self.on_change(catalog_changed, changed)
+        self.widget.after(self.interval, self._drain)
+
+LOAD_POLL_MS = 10
+LOAD_SLICE_S = 0.05
+LOAD_REFRESH_S = 0.5
+
+class BackgroundLoader:
+    # Reads the students on a worker thread so the window comes up right
+    # away instead of after the whole file is parsed. The thread puts
+    # parsed chunks on a queue; the Tk thread turns them into records from
+    # after() callbacks, LOAD_SLICE_S at a time so the window stays
+    # responsive. on_progress(count, first) runs after each batch and
+    # on_done(error) once everything is in.
+    def __init__(self, widget, data, on_progress, on_done, chunk_size=LOAD_CHUNK_ROWS):
+        self.widget = widget
+        self.data = data
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.chunk_size = chunk_size
+        self.chunks = queue.Queue()
+        self.first = True
+
+    def start(self):
+        self.data.loading = True
+        self.data.repo.begin_load()
+        threading.Thread(target=self._run, daemon=True).start()
+        self.widget.after(LOAD_POLL_MS, self._drain)
+
+    def _run(self):
+        try:
+            for chunk in self.data.repo.storage.load_chunks(self.chunk_size):
+                self.chunks.put(chunk)
+        except (OSError, csv.Error, sqlite3.Error) as e:
+            self.chunks.put(e)
+        self.chunks.put(None)
+
+    def _drain(self):
+        repo = self.data.repo
+        deadline = time.perf_counter() + LOAD_SLICE_S
+        loaded = False
+        while time.perf_counter() < deadline:
+            try:
+                chunk = self.chunks.get_nowait()
+            except queue.Empty:
+                break
+            if chunk is None or isinstance(chunk, Exception):
+                repo.finish_load()
+                self.data.loading = False
+                self.on_done(chunk)
+                return
+            repo.load_chunk(chunk)
+            loaded = True
+        if loaded:
+            self.on_progress(len(repo), self.first)
+            self.first = False
+        self.widget.after(LOAD_POLL_MS, self._drain)
+
+def on_external_change(catalog_changed, students_changed):
+    if catalog_changed:
+        refresh_filter_dropdowns()
+    refresh_students()
+    update_summary()
 
-    students = load_filtered_students(college, program, sort_option)
+def on_data_edited():
+    # After a program is added, edited or deleted in the Program Manager
+    refresh_filter_dropdowns()
+    refresh_students()
+    update_summary()
 
-    student_tbl.delete(*student_tbl.get_children())
+app_data.listeners.append(on_data_edited)
 
-    for student in students:
-        if not query or any(query in str(value).lower() for value in student.values()):
-            student_tbl.insert('', 'end', values=[
-                student['Student ID'], student['Last Name'], student['First Name'], student['Gender'],
-                student['College'], student['College Code'], student['Program'], student['Program Code'], student['Year']
-            ])
+def search_students(event=None):
+    live_search.cancel()
+    college = filter_value('college')
+    program = filter_value('program')
+    gender = filter_value('gender')
+    year = filter_value('year')
+    sort_option = sort_by_var.get()
+
+    students = load_filtered_students(college, program, gender, year, sort_option,
+                                      live_search.search(search_var.get()))
+    student_table.set_rows(students, keep_position=False)
             
+live_search = IncrementalSearch(win, search_index, search_students)
+
 # Filter Frame (must be defined FIRST)
 filter_frame = tk.LabelFrame(win, text="", font=("Arial", 18, "bold"), bg="#F3EBDF", bd=0)
 filter_frame.place(x=150, y=70)
@@ -1885,36 +1547,72 @@ filter_frame.place(x=150, y=70)
 college_filter_var = tk.StringVar(value="All Colleges")
 program_filter_var = tk.StringVar(value="All Programs")
 gender_filter_var = tk.StringVar(value="All Genders")
+year_filter_var = tk.StringVar(value="All Years")
 sort_by_var = tk.StringVar(value="First Name Asc")
 
 # College Filter Label & Dropdown
 tk.Label(filter_frame, text="Filter by College:", font=("Arial", 10), bg="#F3EBDF").grid(row=0, column=2, padx=5, sticky="w")
 college_filter = ttk.Combobox(filter_frame, textvariable=college_filter_var, font=("Arial", 12), state="readonly", width=15)
 college_list = load_colleges(return_list=True)
-college_filter['values'] = ["All Colleges"] + college_list
-college_filter.current(0)
 college_filter.grid(row=0, column=3, padx=5, pady=2)
 
 # Program Filter Label & Dropdown
 tk.Label(filter_frame, text="Filter by Program:", font=("Arial", 10), bg="#F3EBDF").grid(row=0, column=4, padx=5, sticky="w")
 program_filter = ttk.Combobox(filter_frame, textvariable=program_filter_var, font=("Arial", 12), state="readonly", width=15)
-program_filter['values'] = load_programs("All Colleges")
-program_filter.current(0)
 program_filter.grid(row=0, column=5, padx=5, pady=2)
 
 tk.Label(filter_frame, text="Filter by Gender:", font=("Arial", 10), bg="#F3EBDF").grid(row=0, column=6, padx=5, sticky="w")
 gender_filter = ttk.Combobox(filter_frame, textvariable=gender_filter_var, font=("Arial", 12), state="readonly", width=15)
-gender_filter['values'] = ["All Genders", "Male", "Female"]
-gender_filter.current(0)
 gender_filter.grid(row=0, column=7, padx=5, pady=2)
 
+tk.Label(filter_frame, text="Filter by Year:", font=("Arial", 10), bg="#F3EBDF").grid(row=1, column=6, padx=5, pady=(10, 0), sticky="w")
+year_filter = ttk.Combobox(filter_frame, textvariable=year_filter_var, font=("Arial", 12), state="readonly", width=15)
+year_filter.grid(row=1, column=7, padx=5, pady=(10, 0))
+
+# Each filter choice is shown as "<choice> (<count>)": how many students it
+# would show with the other filters as they are. filter_choices holds the
+# plain choices and filter_labels maps the labels back to them.
+filter_vars = {'college': college_filter_var, 'program': program_filter_var,
+               'gender': gender_filter_var, 'year': year_filter_var}
+filter_boxes = {'college': college_filter, 'program': program_filter, 'gender': gender_filter, 'year': year_filter}
+filter_choices = {'college': college_list, 'program': load_programs("All Colleges"),
+                  'gender': ["All Genders", "Male", "Female"], 'year': ["All Years", "1", "2", "3", "4"]}
+filter_labels = {facet: {} for facet in FACETS}
+
+def filter_value(facet):
+    value = filter_vars[facet].get()
+    return filter_labels[facet].get(value, value)
+
+def update_filter_counts(event=None):
+    # Plain choices until every student is loaded
+    values = [filter_value(facet) for facet in FACETS]
+    counts = None if app_data.loading else student_repo.facet_counts(*values)
+    for facet, value in zip(FACETS, values):
+        labels = {}
+        for choice in filter_choices[facet]:
+            if counts is None:
+                labels[choice] = choice
+                continue
+            value_counts = counts[facet]
+            count = sum(value_counts.values()) if choice == FACET_ALL[facet] else value_counts.get(choice, 0)
+            labels[f"{choice} ({count:,})"] = choice
+        filter_labels[facet] = labels
+        filter_boxes[facet]['values'] = list(labels)
+        filter_vars[facet].set(next((label for label, choice in labels.items() if choice == value), value))
+
+def set_filter_choices(**choices):
+    # New plain choices for filter dropdowns, by FACETS name
+    filter_choices.update(choices)
+    update_filter_counts()
+
 # When college changes, update program list
 def update_program_filter(event):
-    selected_college = college_filter_var.get()
-    program_filter['values'] = load_programs(selected_college)
-    program_filter.current(0)
+    program_filter_var.set("All Programs")
+    set_filter_choices(program=load_programs(filter_value('college')))
 
 college_filter.bind("<<ComboboxSelected>>", update_program_filter)
+for box in (program_filter, gender_filter, year_filter):
+    box.bind("<<ComboboxSelected>>", update_filter_counts)
 
 # Sort Label & Dropdown
 tk.Label(filter_frame, text="Sort by:", font=("Arial", 10), bg="#F3EBDF").grid(row=0, column=0, padx=5, sticky="w")
@@ -1931,8 +1629,83 @@ sort_dropdown.grid(row=0, column=1, padx=5, pady=(0, 1))
 apply_filter_btn = tk.Button(filter_frame, text="Apply Filters", command=refresh_students, font=("Arial", 11), bg="#6A1314", fg="white")
 apply_filter_btn.grid(row=1, column=4, pady=(10, 0), sticky="e")
 
+def import_students_dialog():
+    file_path = filedialog.askopenfilename(title="Import Students",
+                                           filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+    if not file_path:
+        return
+    try:
+        imported, errors = import_students(file_path, student_repo, catalog)
+    except (OSError, ValueError, csv.Error) as e:
+        messagebox.showerror("Import Error", f"Could not import {os.path.basename(file_path)}:\n{e}")
+        return
+
+    message = f"Imported {imported} student(s)."
+    if errors:
+        # The full list goes next to the imported file
+        report_path = os.path.splitext(file_path)[0] + '.errors.csv'
+        write_import_errors(report_path, errors)
+        lines = [f"Line {line} ({student_id or 'no ID'}): " + " ".join(e.lstrip('• ') for e in row_errors)
+                 for line, student_id, row_errors in errors[:IMPORT_ERROR_PREVIEW]]
+        if len(errors) > IMPORT_ERROR_PREVIEW:
+            lines.append(f"...and {len(errors) - IMPORT_ERROR_PREVIEW} more.")
+        message += f"\n{len(errors)} row(s) skipped, listed in {os.path.basename(report_path)}:\n\n" + "\n".join(lines)
+        messagebox.showwarning("Import Students", message)
+    else:
+        messagebox.showinfo("Import Students", message)
+    set_filter_choices(program=load_programs(filter_value('college')))
+    refresh_students()
+    update_summary()
+
+import_btn = tk.Button(filter_frame, text="Import Students", command=import_students_dialog, font=("Arial", 11), bg="#6A1314", fg="white")
+import_btn.grid(row=1, column=5, padx=5, pady=(10, 0), sticky="w")
+
+# Shown while the BackgroundLoader fills the table
+load_progress = ttk.Progressbar(summary_frame, mode="indeterminate", length=200)
+load_progress.pack(side=tk.RIGHT, padx=20)
+load_status = tk.Label(summary_frame, text="Loading students...", font=("Arial", 10), bg="#F3EBDF")
+load_status.pack(side=tk.RIGHT)
+# Editing waits until every student is in, so a new or changed ID can't
+# collide with one that hasn't been read yet
+loading_buttons = [register_btn, show_btn, update_btn, delete_btn, college_btn, program_btn, import_btn]
+next_load_refresh = 0
+
+def on_load_progress(count, first):
+    global next_load_refresh
+    load_status.config(text=f"Loading students... {count:,}")
+    # The first chunk fills the first screen; after that the table is only
+    # re-queried every LOAD_REFRESH_S, or less often once the query itself
+    # gets slow, so refreshing doesn't crowd out the loading
+    start = time.perf_counter()
+    if first or start >= next_load_refresh:
+        refresh_students()
+        update_summary()
+        end = time.perf_counter()
+        next_load_refresh = end + max(LOAD_REFRESH_S, 4 * (end - start))
+
+def on_students_loaded(error):
+    load_progress.stop()
+    load_progress.pack_forget()
+    load_status.pack_forget()
+    for button in loading_buttons:
+        button.config(state=tk.NORMAL)
+    if error is not None:
+        messagebox.showerror("Load Error", f"Could not read all student records:\n{error}")
+    # "N/A" is only offered once a student is known to have it
+    set_filter_choices(program=load_programs(filter_value('college')))
+    refresh_students()
+    update_summary()
+    data_watcher.start()
+
+data_watcher = DataWatcher(win, app_data, on_external_change)
+student_loader = BackgroundLoader(win, app_data, on_load_progress, on_students_loaded)
+
+for button in loading_buttons:
+    button.config(state=tk.DISABLED)
+load_progress.start()
+student_loader.start()
+update_filter_counts()
 update_summary()
-refresh_students()
 win.mainloop()
 
 
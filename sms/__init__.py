@@ -0,0 +1,8 @@
+# Headless core of the Student Management System: the data, query and
+# edit layer behind mainf1.py (the Tk window) and the command line
+# (python -m sms). Nothing in this package imports tkinter.
+from .catalog import Catalog, College, Program
+from .importing import import_students
+from .logic import CatalogCascade, CollegeManagerLogic, DataCache, ProgramManagerLogic, open_data
+from .query import FACETS, STUDENT_SORTS
+from .students import StudentRecord, StudentRepository, make_student_storage
@@ -0,0 +1,252 @@
+# Colleges and programs (colleges.csv and programs.csv).
+from .files import COLLEGE_CSV, PROGRAM_CSV, WriteGroup, file_stamp, read_csv, write_csv
+from .query import FieldGroups
+
+COLLEGE_FIELDS = ['College Name', 'College Code']
+PROGRAM_FIELDS = ['Program Name', 'Program Code', 'College Name', 'College Code']
+
+class College:
+    # One college. Programs and students hold a reference to this object
+    # rather than their own copy of the name and code.
+    __slots__ = ('name', 'code', 'listed')
+
+    def __init__(self, name, code):
+        self.name = name
+        self.code = code
+        self.listed = False
+
+    def row(self):
+        return {'College Name': self.name, 'College Code': self.code}
+
+    def __getitem__(self, field):
+        return self.row()[field]
+
+class Program:
+    __slots__ = ('name', 'code', 'college', 'listed')
+
+    def __init__(self, name, code, college=None):
+        self.name = name
+        self.code = code
+        self.college = college
+        self.listed = False
+
+    def row(self):
+        college = self.college
+        return {'Program Name': self.name, 'Program Code': self.code,
+                'College Name': college.name if college else '',
+                'College Code': college.code if college else ''}
+
+    def __getitem__(self, field):
+        return self.row()[field]
+
+def clean_field(row, field):
+    return (row.get(field) or '').strip()
+
+class Catalog:
+    # colleges.csv and programs.csv as shared College/Program objects.
+    # Renaming either is a change to one object that every program and
+    # student referencing it sees. Codes that are not (or no longer) in
+    # the CSVs, such as 'N/A', get a detached entry keyed by (name, code)
+    # so the students using them still resolve to their own values.
+    def __init__(self, college_file=COLLEGE_CSV, program_file=PROGRAM_CSV):
+        self.college_file = college_file
+        self.program_file = program_file
+        self.colleges = []
+        self.programs = []
+        self.program_counts = FieldGroups(lambda program: program.college)
+        self.listeners = []
+        self.version = 0
+        self.stamps = None
+        self._college_programs = (None, {})
+        self._colleges = {}
+        self._programs = {}
+        self._detached_colleges = {}
+        self._detached_programs = {}
+        self.load()
+
+    def load(self):
+        # Re-reads both CSVs. Objects are updated in place (matched by code)
+        # so the students pointing at them stay valid.
+        stale, self._colleges = self._colleges, {}
+        self.colleges[:] = []
+        for row in read_csv(self.college_file):
+            name, code = clean_field(row, 'College Name'), clean_field(row, 'College Code')
+            if name and code:
+                college = (stale.pop(code, None) or self._take_detached(self._detached_colleges, code)
+                           or College(name, code))
+                college.name = name
+                self._list(college, self._colleges, self.colleges)
+        for college in stale.values():
+            self._detach(college, self._detached_colleges)
+
+        stale, self._programs = self._programs, {}
+        self.programs[:] = []
+        for row in read_csv(self.program_file):
+            name, code = clean_field(row, 'Program Name'), clean_field(row, 'Program Code')
+            if name and code:
+                program = (stale.pop(code, None) or self._take_detached(self._detached_programs, code)
+                           or Program(name, code))
+                program.name = name
+                program.college = self.college_ref(row.get('College Name'), row.get('College Code'))
+                self._list(program, self._programs, self.programs)
+        for program in stale.values():
+            self._detach(program, self._detached_programs)
+
+        self.program_counts.rebuild(self.programs)
+        self.stamps = self._file_stamps()
+        self._changed()
+
+    def refresh(self):
+        # Re-load only when another program changed the CSVs on disk
+        if self.changed_on_disk():
+            self.load()
+        return self
+
+    def college(self, code):
+        return self._colleges.get((code or '').strip())
+
+    def program(self, code):
+        return self._programs.get((code or '').strip())
+
+    def colleges_named(self, name):
+        return ([c for c in self.colleges if c.name == name] +
+                [c for c in self._detached_colleges.values() if c.name == name])
+
+    def programs_named(self, name):
+        return ([p for p in self.programs if p.name == name] +
+                [p for p in self._detached_programs.values() if p.name == name])
+
+    def college_programs(self):
+        # {college code: {"name", "code", "programs": {program name: code}}}
+        # for the listed colleges, in CSV order, for the dropdowns and
+        # student forms. Rebuilt only when version changes (any college or
+        # program change), so the popups read and scan nothing. Read-only.
+        version, table = self._college_programs
+        if version != self.version:
+            table = {c.code: {"name": c.name, "code": c.code, "programs": {}} for c in self.colleges}
+            for program in self.programs:
+                if program.college.listed:
+                    table[program.college.code]["programs"][program.name] = program.code
+            self._college_programs = (self.version, table)
+        return table
+
+    def college_ref(self, name, code):
+        # The college a student/program row refers to: the listed college
+        # with that code, or a detached one carrying the row's own values
+        name, code = (name or '').strip(), (code or '').strip()
+        college = self._colleges.get(code) if code else next((c for c in self.colleges if c.name == name), None)
+        if college is None:
+            college = self._detached_colleges.get((name, code))
+            if college is None:
+                college = self._detached_colleges[(name, code)] = College(name, code)
+        return college
+
+    def program_ref(self, name, code, college=None):
+        name, code = (name or '').strip(), (code or '').strip()
+        program = self._programs.get(code) if code else next((p for p in self.programs if p.name == name), None)
+        if program is None:
+            program = self._detached_programs.get((name, code))
+            if program is None:
+                program = self._detached_programs[(name, code)] = Program(name, code, college)
+        return program
+
+    def add_college(self, name, code):
+        college = self._take_detached(self._detached_colleges, code) or College(name, code)
+        college.name = name
+        self._list(college, self._colleges, self.colleges)
+        self.save_colleges()
+        return college
+
+    def update_college(self, college, name, code):
+        if code != college.code:
+            self._colleges.pop(college.code, None)
+            self._colleges[code] = college
+        college.name, college.code = name, code
+        # programs.csv repeats the college name and code
+        with WriteGroup():
+            self.save_colleges()
+            self.save_programs()
+
+    def delete_college(self, college, replacement):
+        self.colleges.remove(college)
+        self._colleges.pop(college.code, None)
+        college.listed = False
+        for program in self.program_counts.rows(college):
+            self.program_counts.remove(program)
+            program.college = replacement
+            self.program_counts.add(program)
+        with WriteGroup():
+            self.save_colleges()
+            self.save_programs()
+
+    def add_program(self, name, code, college):
+        program = self._take_detached(self._detached_programs, code) or Program(name, code)
+        program.name, program.college = name, college
+        self._list(program, self._programs, self.programs)
+        self.program_counts.add(program)
+        self.save_programs()
+        return program
+
+    def update_program(self, program, name, code, college):
+        self.program_counts.remove(program)
+        if code != program.code:
+            self._programs.pop(program.code, None)
+            self._programs[code] = program
+        program.name, program.code, program.college = name, code, college
+        self.program_counts.add(program)
+        self.save_programs()
+
+    def delete_program(self, program):
+        self.programs.remove(program)
+        self._programs.pop(program.code, None)
+        program.listed = False
+        self.program_counts.remove(program)
+        self.save_programs()
+
+    def save_colleges(self):
+        # Only this file's stamp: an outside change to the other one must
+        # still be noticed
+        write_csv(self.college_file, COLLEGE_FIELDS, [c.row() for c in self.colleges],
+                  on_commit=lambda: self._file_written(0, self.college_file))
+        self._changed()
+
+    def save_programs(self):
+        write_csv(self.program_file, PROGRAM_FIELDS, [p.row() for p in self.programs],
+                  on_commit=lambda: self._file_written(1, self.program_file))
+        self._changed()
+
+    def _file_written(self, index, path):
+        stamps = list(self.stamps)
+        stamps[index] = file_stamp(path)
+        self.stamps = tuple(stamps)
+
+    def changed_on_disk(self):
+        return self._file_stamps() != self.stamps
+
+    def _file_stamps(self):
+        return (file_stamp(self.college_file), file_stamp(self.program_file))
+
+    def _changed(self):
+        self.version += 1
+        for listener in self.listeners:
+            listener()
+
+    @staticmethod
+    def _list(entity, by_code, entities):
+        entity.listed = True
+        by_code[entity.code] = entity
+        entities.append(entity)
+
+    @staticmethod
+    def _detach(entity, detached):
+        entity.listed = False
+        detached[(entity.name, entity.code)] = entity
+
+    @staticmethod
+    def _take_detached(detached, code):
+        # A code that comes (back) into the CSVs adopts the detached object
+        # so students already pointing at it follow along
+        for key in detached:
+            if key[1] == code:
+                return detached.pop(key)
+        return None
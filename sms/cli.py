@@ -0,0 +1,136 @@
+# Command line for the student data without a display, e.g. for batch
+# jobs on a server:
+#
+#   python -m sms query --college "College of Engineering" --sort "Last Name Asc"
+#   python -m sms import new_students.csv
+#   python -m sms export backup.csv
+#   python -m sms counts --gender Female
+#
+# It works on the CSV files (or SMS_STORAGE=sqlite database) in the
+# current directory, or the one given with -C/--data-dir.
+import argparse
+import csv
+import json
+import os
+import sys
+
+from .files import write_csv_chunks
+from .importing import import_students, write_import_errors
+from .logic import open_data
+from .query import FACET_ALL, FACETS, STUDENT_SORTS
+from .students import STUDENT_FIELDS, StudentRecord, student_row_chunks
+
+def add_filters(parser):
+    for facet in FACETS:
+        parser.add_argument(f'--{facet}', default=FACET_ALL[facet],
+                            help=f'only students with this {facet} (default: {FACET_ALL[facet]})')
+
+def filters(args):
+    # (college, program, gender, year) as StudentRepository.query takes them
+    return [getattr(args, facet) for facet in FACETS]
+
+def write_rows(rows):
+    writer = csv.DictWriter(sys.stdout, STUDENT_FIELDS, lineterminator='\n')
+    writer.writeheader()
+    writer.writerows(rows)
+
+def run_query(data, args):
+    student_ids = None if args.search is None else data.search_index.search(args.search)
+    college, program, gender, year = filters(args)
+    students = data.repo.query(college, program, gender, args.sort, student_ids, year=year)
+    if args.limit is not None:
+        students = students[:args.limit]
+    rows = map(StudentRecord.to_row, students)
+    if args.format == 'json':
+        json.dump(list(rows), sys.stdout, indent=2)
+        print()
+    else:
+        write_rows(rows)
+    return 0
+
+def run_import(data, args):
+    imported, errors = import_students(args.file, data.repo, data.catalog)
+    data.repo.close()
+    print(f"Imported {imported} student(s).")
+    if errors:
+        report_path = args.errors or os.path.splitext(args.file)[0] + '.errors.csv'
+        write_import_errors(report_path, errors)
+        print(f"{len(errors)} row(s) skipped, listed in {report_path}.", file=sys.stderr)
+        return 1
+    return 0
+
+def run_export(data, args):
+    students = data.repo.students.values()
+    if args.file is None:
+        write_rows(row for chunk in student_row_chunks(students) for row in chunk)
+    else:
+        write_csv_chunks(args.file, STUDENT_FIELDS, student_row_chunks(students))
+        print(f"Exported {len(data.repo)} student(s) to {args.file}.")
+    return 0
+
+def run_counts(data, args):
+    # Totals, and how many students each filter value would match given
+    # the other filters (what the GUI shows in its filter dropdowns)
+    college, program, gender, year = filters(args)
+    counts = data.repo.facet_counts(college, program, gender, year)
+    totals = {'colleges': len(data.catalog.colleges), 'programs': len(data.catalog.programs),
+              'students': len(data.repo), 'matching': len(data.repo.query(college, program, gender, year=year))}
+    if args.format == 'json':
+        json.dump({'totals': totals, **{facet: dict(counts[facet]) for facet in FACETS}}, sys.stdout, indent=2)
+        print()
+        return 0
+    print(f"Total Colleges: {totals['colleges']}")
+    print(f"Total Programs: {totals['programs']}")
+    print(f"Total Students: {totals['students']}")
+    print(f"Matching Students: {totals['matching']}")
+    for facet in FACETS:
+        print(f"\n{facet.title()}:")
+        for value, count in sorted(counts[facet].items(), key=lambda item: (-item[1], item[0])):
+            print(f"  {value or '(blank)'}: {count}")
+    return 0
+
+def make_parser():
+    parser = argparse.ArgumentParser(prog='sms', description="Student Management System data without the GUI.")
+    parser.add_argument('-C', '--data-dir', help="directory holding the data files (default: current directory)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    query = commands.add_parser('query', help="print the students matching filters and/or a search")
+    add_filters(query)
+    query.add_argument('--search', help="search text, as typed in the GUI's search bar")
+    query.add_argument('--sort', choices=list(STUDENT_SORTS), help="sort option (default: storage order)")
+    query.add_argument('--limit', type=int, help="print at most this many students")
+    query.add_argument('--format', choices=['csv', 'json'], default='csv')
+    query.set_defaults(run=run_query)
+
+    import_ = commands.add_parser('import', help="add the students in a CSV file")
+    import_.add_argument('file')
+    import_.add_argument('--errors', help="where to list skipped rows (default: <file>.errors.csv)")
+    import_.set_defaults(run=run_import)
+
+    export = commands.add_parser('export', help="write every student to a CSV file (default: stdout)")
+    export.add_argument('file', nargs='?')
+    export.set_defaults(run=run_export)
+
+    counts = commands.add_parser('counts', help="print totals and per-value counts")
+    add_filters(counts)
+    counts.add_argument('--format', choices=['text', 'json'], default='text')
+    counts.set_defaults(run=run_counts)
+    return parser
+
+def main(argv=None):
+    args = make_parser().parse_args(argv)
+    # File arguments are relative to where the command was run
+    for name in ('file', 'errors'):
+        if getattr(args, name, None):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+    try:
+        if args.data_dir:
+            os.chdir(args.data_dir)
+        return args.run(open_data(), args)
+    except BrokenPipeError:
+        # The output was piped into something that stopped reading (head)
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    except (OSError, ValueError, csv.Error) as e:
+        print(f"sms: {e}", file=sys.stderr)
+        return 2
@@ -0,0 +1,260 @@
+# File helpers shared by the catalog and student storage: chunked CSV
+# reads/writes, atomic replacement through a temp file, durable appends,
+# and WriteGroup for committing several files (and database changes)
+# together.
+from contextlib import contextmanager
+import csv
+from itertools import islice
+import json
+import os
+import threading
+
+COLLEGE_CSV = 'colleges.csv'
+PROGRAM_CSV = 'programs.csv'
+STUDENT_CSV = 'students.csv'
+
+CSV_CHUNK_ROWS = 2000
+
+def iter_csv(file_path):
+    # Rows one at a time; a missing file reads as empty
+    try:
+        with open(file_path, newline='', encoding='utf-8') as f:
+            yield from csv.DictReader(f)
+    except FileNotFoundError:
+        return
+
+def read_csv(file_path):
+    return list(iter_csv(file_path))
+
+def chunked(rows, size=CSV_CHUNK_ROWS):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+def write_csv(file_path, fieldnames, data, on_commit=None):
+    write_csv_chunks(file_path, fieldnames, [data], on_commit)
+
+def write_csv_chunks(file_path, fieldnames, chunks, on_commit=None):
+    # Streams chunks of rows into a temp file next to file_path, fsyncs it
+    # and renames it over file_path (see commit_file), so only one chunk is
+    # held at a time and file_path is never left half-written
+    temp_path = file_path + '.tmp'
+    try:
+        with open(temp_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            for chunk in chunks:
+                writer.writerows(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        remove_file(temp_path)
+        raise
+    commit_file(temp_path, file_path, on_commit)
+
+def remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def fsync_dir(path):
+    # Makes a rename in path's directory durable; directories can't be
+    # opened for this on Windows, where it isn't needed
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+WRITE_GROUP_MANIFEST = 'pending-writes.json'
+_write_groups = threading.local()
+
+def commit_file(temp_path, file_path, on_commit=None):
+    # Puts a finished temp file in place of file_path. Inside a WriteGroup
+    # (on this thread) it waits for the group; on_commit runs once the new
+    # file is in place.
+    group = getattr(_write_groups, 'current', None)
+    if group is not None:
+        group.add(temp_path, file_path, on_commit)
+        return
+    os.replace(temp_path, file_path)
+    fsync_dir(file_path)
+    if on_commit is not None:
+        on_commit()
+
+def append_file(file_path, data, on_commit=None):
+    # Appends bytes to file_path and fsyncs them. Inside a WriteGroup they
+    # are collected in a temp file instead and appended when the group
+    # commits; on_commit runs once they are in file_path.
+    group = getattr(_write_groups, 'current', None)
+    if group is not None:
+        group.add_append(file_path, data, on_commit)
+        return
+    with open(file_path, 'ab') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    if on_commit is not None:
+        on_commit()
+
+def append_from(temp_path, file_path):
+    # Moves a group's staged appends onto the end of file_path. They start
+    # on a new line, so a torn last line (a crash mid-append) can't run
+    # into them. Repeating this after a crash part-way only duplicates the
+    # lines, which the student journal replays to the same result.
+    with open(temp_path, 'rb') as f:
+        data = f.read()
+    with open(file_path, 'a+b') as f:
+        if f.tell():
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                data = b'\n' + data
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.remove(temp_path)
+    fsync_dir(file_path)
+
+@contextmanager
+def transaction(conn):
+    # A database transaction on conn that commits at the end of the
+    # with-block, or with the WriteGroup on this thread if there is one.
+    # An exception rolls it back.
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    group = getattr(_write_groups, 'current', None)
+    if group is None:
+        conn.commit()
+    else:
+        group.enlist(conn)
+
+class WriteGroup:
+    # Makes the file writes of one logical operation all-or-nothing, e.g. a
+    # college delete that rewrites colleges.csv, programs.csv and
+    # students.csv. Writes inside the with-block only produce temp files.
+    # On a clean exit the renames are written to a manifest before any is
+    # done, so recover() can finish them after a crash part-way through; on
+    # an exception the temp files are dropped and no file changes. Nested
+    # groups join the outermost one. Appends (the student journal) are
+    # staged the same way and appended at commit.
+    #
+    # Database connections written through transaction() are enlisted too:
+    # they commit right after the manifest is written and before any file
+    # is replaced, and roll back with the temp files. The two can't commit
+    # as one step, so a crash between the manifest and the database
+    # commit still leaves the files done by recover() and the database
+    # rolled back. A database commit that fails drops the whole group.
+    def __init__(self, manifest_path=WRITE_GROUP_MANIFEST):
+        self.manifest_path = manifest_path
+        self.writes = {}
+        self.appends = {}
+        self.connections = []
+        self.outer = None
+
+    def __enter__(self):
+        self.outer = getattr(_write_groups, 'current', None)
+        if self.outer is None:
+            _write_groups.current = self
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.outer is not None:
+            return False
+        _write_groups.current = None
+        if exc_type is None:
+            self.commit()
+        else:
+            self.discard()
+        return False
+
+    def discard(self):
+        for conn in self.connections:
+            conn.rollback()
+        for temp_path, on_commit in [*self.writes.values(), *self.appends.values()]:
+            remove_file(temp_path)
+
+    def add(self, temp_path, file_path, on_commit=None):
+        self.writes[file_path] = (temp_path, on_commit)
+
+    def add_append(self, file_path, data, on_commit=None):
+        temp_path = file_path + '.append.tmp'
+        with open(temp_path, 'ab' if file_path in self.appends else 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        self.appends[file_path] = (temp_path, on_commit)
+
+    def enlist(self, conn):
+        if conn not in self.connections:
+            self.connections.append(conn)
+
+    def commit(self):
+        files = bool(self.writes or self.appends)
+        try:
+            if files:
+                self.write_manifest()
+            for conn in self.connections:
+                conn.commit()
+        except BaseException:
+            if files:
+                remove_file(self.manifest_path + '.tmp')
+                remove_file(self.manifest_path)
+            self.discard()
+            raise
+        if not files:
+            return
+        self.recover(self.manifest_path)
+        for temp_path, on_commit in [*self.writes.values(), *self.appends.values()]:
+            if on_commit is not None:
+                on_commit()
+
+    def write_manifest(self):
+        steps = ([[temp_path, file_path] for file_path, (temp_path, _) in self.writes.items()] +
+                 [[temp_path, file_path, 'append'] for file_path, (temp_path, _) in self.appends.items()])
+        manifest_temp = self.manifest_path + '.tmp'
+        with open(manifest_temp, 'w', encoding='utf-8') as f:
+            json.dump(steps, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(manifest_temp, self.manifest_path)
+        fsync_dir(self.manifest_path)
+
+    @staticmethod
+    def recover(manifest_path=WRITE_GROUP_MANIFEST):
+        # Finishes the renames and appends of a group that committed but
+        # may not have completed them; run at startup before anything is
+        # read. A step whose temp file is gone already ran.
+        try:
+            with open(manifest_path, encoding='utf-8') as f:
+                steps = json.load(f)
+        except FileNotFoundError:
+            return
+        for temp_path, file_path, *append in steps:
+            if not os.path.exists(temp_path):
+                continue
+            if append:
+                append_from(temp_path, file_path)
+            else:
+                os.replace(temp_path, file_path)
+                fsync_dir(file_path)
+        os.remove(manifest_path)
+
+def file_stamp(path):
+    # Changes when the file is rewritten in place or replaced by a new one
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
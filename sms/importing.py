@@ -0,0 +1,96 @@
+# Bulk import of students from a CSV file.
+import csv
+
+from .files import write_csv
+from .students import STUDENT_FIELDS, StudentRecord, validate_student_data
+
+IMPORT_HEADERS = {' '.join(field.lower().split()): field for field in STUDENT_FIELDS}
+IMPORT_HEADERS.update({'id': 'Student ID', 'id no.': 'Student ID', 'year level': 'Year'})
+IMPORT_ERROR_PREVIEW = 20
+
+def read_student_import(file_path):
+    # (line number, row) for each non-blank row of a students file, as we
+    # export it or as a spreadsheet saves it: a UTF-8 BOM, ';' or tab
+    # delimiters and loosely written headers are accepted
+    with open(file_path, newline='', encoding='utf-8-sig') as f:
+        try:
+            dialect = csv.Sniffer().sniff(f.read(4096), delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        f.seek(0)
+        reader = csv.reader(f, dialect)
+        fields = [IMPORT_HEADERS.get(' '.join(h.replace('_', ' ').lower().split())) for h in next(reader, [])]
+        missing = [field for field in ('Student ID', 'Last Name', 'First Name', 'Gender', 'Year') if field not in fields]
+        if 'College' not in fields and 'College Code' not in fields:
+            missing.append('College')
+        if 'Program' not in fields and 'Program Code' not in fields:
+            missing.append('Program')
+        if missing:
+            raise ValueError(f"Missing column(s): {', '.join(missing)}")
+        for values in reader:
+            if any(value.strip() for value in values):
+                yield reader.line_num, {field: value.strip() for field, value in zip(fields, values) if field}
+
+def validate_import_row(row, catalog):
+    # (StudentRecord, []) for a valid import row, or (None, errors). The
+    # rules are validate_student_data's plus what the registration form's
+    # dropdowns enforce: a known gender, year, college and program.
+    college_code, program_code = row.get('College Code', ''), row.get('Program Code', '')
+    college_name, program_name = row.get('College', ''), row.get('Program', '')
+    data = {
+        "id": row.get('Student ID', ''),
+        "last_name": row.get('Last Name', '').title(),
+        "first_name": row.get('First Name', '').title(),
+        "gender": row.get('Gender') or "Select",
+        "year": row.get('Year') or "Select",
+        "college": college_code or college_name or "Select",
+        "program": program_code or program_name or "Select",
+    }
+    errors = validate_student_data(data)
+    if not data["last_name"] or not data["first_name"]:
+        errors.append("• First Name and Last Name cannot be empty.")
+    if data["gender"] != "Select" and data["gender"] not in ("Male", "Female"):
+        errors.append("• Gender must be Male or Female.")
+    if data["year"] != "Select" and data["year"] not in ("1", "2", "3", "4"):
+        errors.append("• Year Level must be 1, 2, 3 or 4.")
+
+    college = catalog.college(college_code) if college_code else next(iter(catalog.colleges_named(college_name)), None)
+    if data["college"] != "Select" and (college is None or not college.listed):
+        errors.append(f"• College {data['college']} does not exist.")
+        college = None
+    program = None
+    if "N/A" in (program_code, program_name):
+        program = catalog.program_ref('N/A', 'N/A')
+    elif college is not None and data["program"] != "Select":
+        candidates = [catalog.program(program_code)] if program_code else catalog.programs_named(program_name)
+        program = next((p for p in candidates if p is not None and p.listed and p.college is college), None)
+        if program is None:
+            errors.append(f"• Program {data['program']} does not exist in {college.name}.")
+    if errors:
+        return None, errors
+    return StudentRecord(data["id"], data["last_name"], data["first_name"], data["gender"], data["year"],
+                         college, program), []
+
+def import_students(file_path, repo, catalog):
+    # Bulk import: every row is validated in one pass and checked for an ID
+    # already in the repository or earlier in the file, then the valid ones
+    # are added in one batch (one storage write). Returns the number
+    # imported and [(line, Student ID, errors)] for the rows skipped.
+    students, errors, seen = [], [], set()
+    for line, row in read_student_import(file_path):
+        student, row_errors = validate_import_row(row, catalog)
+        student_id = row.get('Student ID', '')
+        if student_id in repo or student_id in seen:
+            row_errors.append(f"• A student with ID {student_id} already exists.")
+        if row_errors:
+            errors.append((line, student_id, row_errors))
+            continue
+        seen.add(student_id)
+        students.append(student)
+    repo.add_many(students)
+    return len(students), errors
+
+def write_import_errors(file_path, errors):
+    write_csv(file_path, ['Line', 'Student ID', 'Errors'],
+              ({'Line': line, 'Student ID': student_id, 'Errors': ' '.join(e.lstrip('• ') for e in row_errors)}
+               for line, student_id, row_errors in errors))
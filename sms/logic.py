@@ -0,0 +1,288 @@
+# Everything the College and Program Manager windows do, without Tk:
+# DataCache (the shared data and its indexes), CatalogCascade and the
+# manager logic classes.
+from datetime import datetime
+import os
+import shutil
+
+from .catalog import Catalog
+from .files import WriteGroup
+from .query import FieldCounter, StudentColumns, StudentSearchIndex
+from .students import StudentRepository, make_student_storage
+
+class CatalogCascade:
+    # Applies a college/program rename or delete together with everything
+    # that refers to it (college -> its programs -> their students). The
+    # affected programs and students are found through the catalog's
+    # program groups and the repository's column index, each file is
+    # written once, and all the writes share one WriteGroup. Every method
+    # returns how many colleges, programs and students it touched.
+    def __init__(self, catalog, repo):
+        self.catalog = catalog
+        self.repo = repo
+
+    def rename_college(self, college, name, code):
+        # Programs and students reference the college object, so they pick
+        # up the new name/code without being touched. The stored student
+        # rows repeat both (students.csv stays denormalized for outside
+        # readers), so any change logs the college's students again.
+        programs = self.catalog.program_counts.get(college)
+        students = self.repo.students_of(college=college)
+        changed = (college.name, college.code) != (name, code)
+        with WriteGroup():
+            self.catalog.update_college(college, name, code)
+            if changed:
+                self.repo.rewrite(students)
+        return {'colleges': 1, 'programs': programs, 'students': len(students) if changed else 0}
+
+    def delete_college(self, college):
+        # Its programs and students move to an unlisted 'N/A' college
+        programs = self.catalog.program_counts.get(college)
+        students = self.repo.students_of(college=college)
+        na = self.catalog.college_ref('N/A', 'N/A')
+        with WriteGroup():
+            self.catalog.delete_college(college, na)
+            self.repo.repoint(students, college=na)
+        return {'colleges': 1, 'programs': programs, 'students': len(students)}
+
+    def update_program(self, program, name, code, college):
+        # Moving the program to another college leaves its students' own
+        # college as it is, so only the name and code reach their rows
+        students = self.repo.students_of(program=program)
+        changed = (program.name, program.code) != (name, code)
+        with WriteGroup():
+            self.catalog.update_program(program, name, code, college)
+            if changed:
+                self.repo.rewrite(students)
+        return {'colleges': 0, 'programs': 1, 'students': len(students) if changed else 0}
+
+    def delete_program(self, program):
+        students = self.repo.students_of(program=program)
+        na = self.catalog.program_ref('N/A', 'N/A')
+        with WriteGroup():
+            self.catalog.delete_program(program)
+            self.repo.repoint(students, program=na)
+        return {'colleges': 0, 'programs': 1, 'students': len(students)}
+
+class DataCache:
+    # The single parsed copy of colleges, programs and students shared by
+    # the main window and the College/Program Manager windows (or a CLI
+    # run), with the indexes every query uses. Our own writes go through
+    # it and keep it current; refresh() only re-reads a file whose stamp
+    # shows another program changed it. While a DataWatcher runs it
+    # applies outside changes itself, so refresh() leaves the files alone
+    # (no stat per call); the students are also left to the
+    # BackgroundLoader while it is still reading them. listeners are called
+    # after an edit made through the manager logic classes.
+    def __init__(self, catalog, repo):
+        self.catalog = catalog
+        self.repo = repo
+        self.watched = False
+        self.loading = False
+        self.listeners = []
+        catalog.listeners.append(repo.catalog_changed)
+        self.search_index = StudentSearchIndex()
+        self.students_by_college = FieldCounter(lambda student: student.college)
+        self.students_by_program = FieldCounter(lambda student: student.program)
+        for index in (self.search_index, StudentColumns(), self.students_by_college, self.students_by_program):
+            repo.add_index(index)
+
+    def refresh(self):
+        if not self.watched:
+            self.catalog.refresh()
+        if not (self.watched or self.loading):
+            self.repo.refresh()
+        return self
+
+    def changed(self):
+        for listener in self.listeners:
+            listener()
+
+def open_data(storage=None, preload=True):
+    # The catalog and students in the working directory. Finishes a
+    # multi-file write interrupted by a crash before reading anything.
+    # preload=False leaves the students for the caller to load.
+    WriteGroup.recover()
+    catalog = Catalog()
+    repo = StudentRepository(make_student_storage() if storage is None else storage, catalog, preload=False)
+    data = DataCache(catalog, repo)
+    if preload:
+        repo.load()
+    return data
+
+class CollegeManagerLogic:
+    def __init__(self, data):
+        self.data = data
+        self.repo = data.repo
+        self.catalog = data.catalog
+        self.cascade = CatalogCascade(self.catalog, self.repo)
+        
+    def get_colleges(self):
+        return self.data.refresh().catalog.colleges
+
+    def backup_csv(self, filename='colleges.csv'):
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        backup_dir = 'backups'
+        os.makedirs(backup_dir, exist_ok=True)
+        backup_filename = os.path.join(backup_dir, f'colleges_backup_{timestamp}.csv')
+        shutil.copy(filename, backup_filename)
+
+    def get_all_colleges(self):
+        return [{
+            'College Name': college.name,
+            'College Code': college.code,
+            'Programs': self.count_programs_by_college(college.code),
+            'Students': self.count_students_by_college(college.code)
+        } for college in self.get_colleges()]
+
+    def count_programs_by_college(self, college_code):
+        return self.catalog.program_counts.get(self.catalog.college(college_code))
+
+    def count_students_by_college(self, college_code):
+        return self.data.students_by_college.get(self.catalog.college(college_code))
+
+    def add_college(self, name, code):
+        name, code = name.strip(), code.strip()
+        for c in self.get_colleges():
+            if c.name.lower() == name.lower() or c.code.lower() == code.lower():
+                raise ValueError("College with this name or code already exists.")
+        self.catalog.add_college(name, code)
+
+
+    def edit_college(self, old_code, new_name, new_code):
+        new_name, new_code = new_name.strip(), new_code.strip()
+        colleges = self.get_colleges()
+        if old_code != new_code and any(c.code.lower() == new_code.lower() for c in colleges):
+            raise ValueError(f"A college with code '{new_code}' already exists.")
+        college = next((c for c in colleges if c.code.lower() == old_code.strip().lower()), None)
+        if college is None:
+            raise ValueError(f"College with code '{old_code}' not found.")
+        return self.cascade.rename_college(college, new_name, new_code)
+                    
+    def update_college(self, old_name, old_code, new_name, new_code):
+        colleges = self.get_colleges()
+
+        # Check for duplicate (only if name or code is changing)
+        for college in colleges:
+            if (college.name == new_name and college.code == new_code and 
+                (new_name != old_name or new_code != old_code)):
+                raise ValueError("A college with the same name and code already exists.")
+
+        college = next((c for c in colleges if c.name == old_name and c.code == old_code), None)
+        if college is None:
+            raise ValueError("College not found for update.")
+
+        return self.cascade.rename_college(college, new_name, new_code)
+
+    def delete_college(self, college_code):
+        college = self.catalog.college(college_code)
+        if college is None:
+            raise ValueError("College not found.")
+
+        # Its programs and students are moved to 'N/A'
+        return self.cascade.delete_college(college)
+
+
+class ProgramManagerLogic:
+    def __init__(self, data):
+        self.data = data
+        self.catalog = data.catalog
+        self.repo = data.repo
+        self.cascade = CatalogCascade(self.catalog, self.repo)
+        self.programs = []
+        self.colleges = []
+        self.load_data()
+
+    def load_data(self):
+        # Colleges, programs and students are shared with the main window
+        # through the data cache; nothing is parsed unless a file changed
+        self.data.refresh()
+        self.colleges = self.catalog.colleges
+        self.programs = self.catalog.programs
+
+    def save_programs(self):
+        self.catalog.save_programs()
+
+    def get_programs(self, filter_text=""):
+        # Returns list of program dicts filtered by program name, code or college name
+        filter_text = filter_text.lower()
+        filtered = []
+        for p in self.programs:
+            if (filter_text in p['Program Name'].lower() or
+                filter_text in p['Program Code'].lower() or
+                filter_text in p['College Name'].lower()):
+                filtered.append(p)
+        filtered.sort(key=lambda p: p['Program Name'].lower())
+        
+        return filtered
+
+    def get_college_names(self):
+        return [c['College Name'] for c in self.colleges]
+
+    def count_students_in_program(self, program_code):
+        return self.data.students_by_program.get(self.catalog.program(program_code))
+
+    def total_students_in_programs(self):
+        # Sum of students assigned to any program (Program Code != '')
+        return len(self.repo) - sum(count for program, count in self.data.students_by_program.counts.items()
+                                       if not program.code)
+
+    def total_programs(self):
+        return len(self.programs)
+
+    def is_duplicate_program(self, program_name, program_code, exclude_index=None):
+        for i, p in enumerate(self.programs):
+            if exclude_index is not None and i == exclude_index:
+                continue
+            if p['Program Name'].lower() == program_name.lower() or p['Program Code'].lower() == program_code.lower():
+                return True
+        return False
+
+    def add_program(self, college_name, program_name, program_code):
+        # Validate inputs
+        if not college_name or not program_name or not program_code:
+            return False, "All fields must be filled."
+        # Check college exists
+        college = next((c for c in self.colleges if c.name == college_name), None)
+        if not college:
+            return False, "Selected college does not exist."
+        # Check duplicates
+        if self.is_duplicate_program(program_name, program_code):
+            return False, "Program name or code already exists."
+
+        self.catalog.add_program(program_name.strip(), program_code.strip(), college)
+        self.data.changed()
+
+        return True, "Program added successfully."
+
+    def update_program(self, index, college_name, program_name, program_code):
+        if index < 0 or index >= len(self.programs):
+            return False, "Invalid program selected."
+        if not college_name or not program_name or not program_code:
+            return False, "All fields must be filled."
+        college = next((c for c in self.colleges if c.name == college_name), None)
+        if not college:
+            return False, "Selected college does not exist."
+        if self.is_duplicate_program(program_name, program_code, exclude_index=index):
+            return False, "Program name or code already exists."
+
+        # Students reference the program object and see the new name/code
+        # right away; the cascade logs their stored rows again
+        counts = self.cascade.update_program(self.programs[index], program_name.strip(), program_code.strip(), college)
+        
+        self.data.changed()
+        return True, f"Program updated successfully. {counts['students']} student(s) affected."
+
+    def save_students(self):
+        self.repo.save()
+
+    def delete_program(self, index):
+        if index < 0 or index >= len(self.programs):
+            return False, "Invalid program selected."
+
+        program_to_delete = self.programs[index]
+
+        # Students assigned to this program get Program and Program Code 'N/A'
+        counts = self.cascade.delete_program(program_to_delete)
+        self.data.changed()
+        return True, f"Program deleted successfully. {counts['students']} student(s) moved to 'N/A'."
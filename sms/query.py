@@ -0,0 +1,688 @@
+# Sorting, filtering and search over the students in memory: the sort
+# options, the filter facets, StudentSearchIndex and the search bar's
+# IncrementalSearch, StudentColumns (with its bitmaps and sorted orders) and
+# the per-field counters.
+from array import array
+from bisect import bisect_right
+from collections import defaultdict
+from itertools import compress
+from operator import attrgetter
+import re
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+YEAR_PRIORITY = {"4": 1, "3": 2, "2": 3, "1": 4}
+YEAR_PRIORITY_SQL = "CASE year WHEN '4' THEN 1 WHEN '3' THEN 2 WHEN '2' THEN 3 WHEN '1' THEN 4 ELSE 5 END"
+
+def year_value(year):
+    try:
+        return int(year)
+    except ValueError:
+        return 0
+
+def year_number(student):
+    return year_value(student["Year"])
+
+def name_key(student):
+    return (student["Last Name"].lower(), student["First Name"].lower())
+
+def gender_rank(gender):
+    return 0 if gender.lower() == "female" else 1
+
+def year_rank(year):
+    return YEAR_PRIORITY.get(year, 5)
+
+NAME_COLUMNS = (("last_name", str.lower), ("first_name", str.lower))
+
+# Sort option -> (Python key, SQL ORDER BY, reverse, StudentColumns key parts)
+STUDENT_SORTS = {
+    "First Name Asc": (lambda s: s["First Name"].lower(), "first_name COLLATE NOCASE", False,
+                       (("first_name", str.lower),)),
+    "First Name Desc": (lambda s: s["First Name"].lower(), "first_name COLLATE NOCASE DESC", True,
+                        (("first_name", str.lower),)),
+    "Last Name Asc": (lambda s: s["Last Name"].lower(), "last_name COLLATE NOCASE", False,
+                      (("last_name", str.lower),)),
+    "Last Name Desc": (lambda s: s["Last Name"].lower(), "last_name COLLATE NOCASE DESC", True,
+                       (("last_name", str.lower),)),
+    "Year Asc": (year_number, "CAST(year AS INTEGER)", False, (("year", year_value),)),
+    "Year Desc": (year_number, "CAST(year AS INTEGER) DESC", True, (("year", year_value),)),
+    "Gender": (lambda s: (gender_rank(s["Gender"]),) + name_key(s),
+               "CASE WHEN lower(gender) = 'female' THEN 0 ELSE 1 END, "
+               "last_name COLLATE NOCASE, first_name COLLATE NOCASE", False,
+               (("gender", gender_rank),) + NAME_COLUMNS),
+    "Year": (lambda s: (year_rank(s["Year"]),) + name_key(s),
+             YEAR_PRIORITY_SQL + ", last_name COLLATE NOCASE, first_name COLLATE NOCASE", False,
+             (("year", year_rank),) + NAME_COLUMNS),
+}
+STUDENT_SORTS["First Name A-Z"] = STUDENT_SORTS["First Name Asc"]
+STUDENT_SORTS["First Name Z-A"] = STUDENT_SORTS["First Name Desc"]
+STUDENT_SORTS["Last Name A-Z"] = STUDENT_SORTS["Last Name Asc"]
+STUDENT_SORTS["Last Name Z-A"] = STUDENT_SORTS["Last Name Desc"]
+
+# Filter dropdowns that show counts: StudentColumns column, how a column
+# value reads in the dropdown, and the choice that turns the filter off
+FACETS = ('college', 'program', 'gender', 'year')
+FACET_NAMES = {'college': attrgetter('name'), 'program': attrgetter('name'), 'gender': str, 'year': str}
+FACET_ALL = {'college': "All Colleges", 'program': "All Programs", 'gender': "All Genders", 'year': "All Years"}
+
+SEARCH_WORD_FIELDS = ["Student ID", "Last Name", "First Name"]
+SEARCH_TOKEN_RE = re.compile(r"[^\W_]+")
+
+def search_tokens(text):
+    return SEARCH_TOKEN_RE.findall(text.lower())
+
+def token_prefixes(tokens):
+    return {token[:end] for token in tokens for end in range(1, len(token) + 1)}
+
+class StudentSearchIndex:
+    # Inverted index for the main search bar. A query matches a student when
+    # each of its words is the start of some word in the student's ID, names,
+    # college, program or codes.
+    #
+    # ID and name words map straight to Student IDs. College/program values
+    # repeat across thousands of rows, so each (college, program) pair of
+    # catalog objects is indexed once as a group and each student just points
+    # at its group. Prefixes are then only expanded per distinct word or
+    # group, and a catalog rename only has to redo the group prefixes.
+    #
+    # Words are interned: each distinct word gets an id once, and the
+    # postings and each student's words hold ids, so a word shared by
+    # thousands of students is one string, and students of the same group
+    # share one (college, program) tuple. Ids aren't reused, so a word
+    # stays in the table after its last student goes. The prefix maps are
+    # only built by the first search (or after a rename) and then kept up
+    # to date, which keeps them out of the load.
+    def __init__(self):
+        self.word_id = {}
+        self.words = []
+        self.word_ids = defaultdict(set)
+        self.group_ids = defaultdict(set)
+        self.words_of = {}
+        self.group_of = {}
+        self._groups = {}
+        self._word_prefixes = None
+        self._group_prefixes = None
+        # Bumped on every change so cached results can tell they are stale
+        self.version = 0
+
+    @staticmethod
+    def _group_tokens(group):
+        college, program = group
+        return search_tokens(' '.join((college.name, college.code, program.name, program.code)))
+
+    def _intern(self, word):
+        word_id = self.word_id.get(word)
+        if word_id is None:
+            word_id = self.word_id[word] = len(self.words)
+            self.words.append(word)
+        return word_id
+
+    def _student_words(self, student):
+        text = ' '.join(student.get(field) or '' for field in SEARCH_WORD_FIELDS)
+        return tuple({self._intern(word) for word in search_tokens(text)})
+
+    def add(self, student):
+        self.version += 1
+        student_id = student['Student ID']
+        words = self._student_words(student)
+        for word in words:
+            ids = self.word_ids[word]
+            if not ids and self._word_prefixes is not None:
+                for prefix in token_prefixes((self.words[word],)):
+                    self._word_prefixes[prefix].add(word)
+            ids.add(student_id)
+        group = (student.college, student.program)
+        group = self._groups.setdefault(group, group)
+        ids = self.group_ids[group]
+        if not ids and self._group_prefixes is not None:
+            for prefix in token_prefixes(self._group_tokens(group)):
+                self._group_prefixes[prefix].add(group)
+        ids.add(student_id)
+        self.words_of[student_id] = words
+        self.group_of[student_id] = group
+
+    def remove(self, student):
+        self.version += 1
+        student_id = student['Student ID']
+        words = self.words_of.pop(student_id, ())
+        group = self.group_of.pop(student_id, None)
+        for word in words:
+            self._discard(self.word_ids, self._word_prefixes, word, student_id, (self.words[word],))
+        if group is not None:
+            self._discard(self.group_ids, self._group_prefixes, group, student_id,
+                          self._group_tokens(group))
+            if group not in self.group_ids:
+                self._groups.pop(group, None)
+
+    @staticmethod
+    def _discard(ids_by_key, prefixes, key, student_id, tokens):
+        ids = ids_by_key.get(key)
+        if ids is None:
+            return
+        ids.discard(student_id)
+        if not ids:
+            del ids_by_key[key]
+            if prefixes is None:
+                return
+            for prefix in token_prefixes(tokens):
+                keys = prefixes.get(prefix)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del prefixes[prefix]
+
+    def catalog_changed(self):
+        self.version += 1
+        self._group_prefixes = None
+
+    def rebuild(self, students):
+        version = self.version
+        self.__init__()
+        self.version = version + 1
+        for student in students:
+            self.add(student)
+
+    def word_prefixes(self):
+        # {prefix: word ids of the words starting with it}
+        if self._word_prefixes is None:
+            self._word_prefixes = defaultdict(set)
+            for word in self.word_ids:
+                for prefix in token_prefixes((self.words[word],)):
+                    self._word_prefixes[prefix].add(word)
+        return self._word_prefixes
+
+    def group_prefixes(self):
+        # {prefix: (college, program) groups with a word starting with it}
+        if self._group_prefixes is None:
+            self._group_prefixes = defaultdict(set)
+            for group in self.group_ids:
+                for prefix in token_prefixes(self._group_tokens(group)):
+                    self._group_prefixes[prefix].add(group)
+        return self._group_prefixes
+
+    def _matching_sets(self, token):
+        return ([self.word_ids[w] for w in self.word_prefixes().get(token, ())] +
+                [self.group_ids[g] for g in self.group_prefixes().get(token, ())])
+
+    def matches(self, student_id, token):
+        words = self.word_prefixes().get(token)
+        if words and not words.isdisjoint(self.words_of.get(student_id, ())):
+            return True
+        groups = self.group_prefixes().get(token)
+        return bool(groups) and self.group_of.get(student_id) in groups
+
+    def search(self, query, candidates=None):
+        # Returns the set of matching Student IDs, or None when the query puts
+        # no restriction on the result (empty, or only words every student
+        # shares such as "college"). The returned set may be one of the index's
+        # own sets and must not be modified. candidates restricts the search
+        # to an earlier result.
+        sized = []
+        group_prefixes = self.group_prefixes()
+        for token in set(search_tokens(query)):
+            if len(group_prefixes.get(token, ())) == len(self.group_ids) and self.group_ids:
+                continue
+            sets = self._matching_sets(token)
+            if not sets:
+                return set()
+            sized.append((sum(len(ids) for ids in sets), token, sets))
+        if not sized:
+            return candidates
+        sized.sort(key=lambda item: item[0])
+        if candidates is None:
+            # Expand the most selective word, then narrow by the rest
+            _, _, sets = sized.pop(0)
+            candidates = sets[0] if len(sets) == 1 else set().union(*sets)
+        for _, token, sets in sized:
+            if len(sets) == 1:
+                candidates = candidates & sets[0]
+            else:
+                candidates = {i for i in candidates if self.matches(i, token)}
+        return candidates
+
+SEARCH_DELAY_MS = 150
+
+class IncrementalSearch:
+    # Runs the search bar query once typing pauses for SEARCH_DELAY_MS;
+    # each keystroke cancels the search queued by the previous one. When the
+    # new query just extends the last one ("gar" -> "garc") the previous
+    # matches are narrowed instead of searching the whole index again.
+    # widget is whatever schedules the run: a Tk widget's after() and
+    # after_cancel() are all it uses.
+    def __init__(self, widget, index, callback, delay=SEARCH_DELAY_MS):
+        self.widget = widget
+        self.index = index
+        self.callback = callback
+        self.delay = delay
+        self._pending = None
+        self.last_query = None
+        self.last_result = None
+        self.last_version = None
+
+    def schedule(self):
+        self.cancel()
+        self._pending = self.widget.after(self.delay, self._run)
+
+    def cancel(self):
+        if self._pending is not None:
+            self.widget.after_cancel(self._pending)
+            self._pending = None
+
+    def _run(self):
+        self._pending = None
+        self.callback()
+
+    def search(self, query):
+        query = query.strip().lower()
+        if (self.last_result is not None and self.last_version == self.index.version
+                and query.startswith(self.last_query)):
+            result = self.index.search(query, candidates=self.last_result)
+        else:
+            result = self.index.search(query)
+        self.last_query = query
+        self.last_result = result
+        self.last_version = self.index.version
+        return result
+
+def and_masks(a, b):
+    # AND of two equal-length 0/1 byte masks, done on big ints so it runs in C
+    return (int.from_bytes(a, 'little') & int.from_bytes(b, 'little')).to_bytes(len(a), 'little')
+
+BIT_DIGITS = bytes.maketrans(b'\x00\x01', b'01')
+BITMAP_REBUILD_CHANGES = 1000
+
+def code_mask(codes, code):
+    # 0/1 mask of the rows of a code array (bytearray or array) holding code
+    if numpy is not None:
+        return numpy.frombuffer(codes, dtype=numpy.uint8 if isinstance(codes, bytearray) else codes.typecode) == code
+    if isinstance(codes, bytearray):
+        return codes.translate(bytes(c == code for c in range(256)))
+    return bytearray(c == code for c in codes)
+
+def mask_bits(mask):
+    # A 0/1 mask as an int with bit n set for row n
+    if numpy is not None and isinstance(mask, numpy.ndarray):
+        return int.from_bytes(numpy.packbits(mask, bitorder='little').tobytes(), 'little')
+    return int(mask[::-1].translate(BIT_DIGITS), 2) if mask else 0
+
+class SlotBitmaps:
+    # Bitmap index over a code array: per code, an int with bit n set when
+    # slot n holds it, so rows matching several filters are counted with &
+    # and int.bit_count(). A code's bitmap is built on first use. Slots
+    # whose code changes afterwards are queued with their old code and
+    # patched in on the next read, or the bitmaps are dropped and rebuilt
+    # when more than BITMAP_REBUILD_CHANGES are queued.
+    def __init__(self):
+        self.bits = None
+        self.changed = {}
+
+    def changing(self, slot, old_code=None):
+        # Before the code at slot changes; old_code None for a new slot
+        if self.bits is not None:
+            self.changed.setdefault(slot, old_code)
+
+    def get(self, codes, code):
+        if self.bits is None or len(self.changed) > BITMAP_REBUILD_CHANGES:
+            self.bits = {}
+            self.changed = {}
+        elif self.changed:
+            for slot, old in self.changed.items():
+                new = codes[slot]
+                if old != new:
+                    bit = 1 << slot
+                    if old in self.bits:
+                        self.bits[old] &= ~bit
+                    if new in self.bits:
+                        self.bits[new] |= bit
+            self.changed = {}
+        bits = self.bits.get(code)
+        if bits is None:
+            bits = self.bits[code] = mask_bits(code_mask(codes, code))
+        return bits
+
+class CodedColumn:
+    # One categorical column: a small integer code per row plus the list of
+    # distinct values the codes stand for. Codes are bytes while there are
+    # at most 256 distinct values (so masks can use bytes.translate) and
+    # widen to 16/32-bit arrays after that.
+    def __init__(self):
+        self.values = []
+        self.code_of = {}
+        self.codes = bytearray()
+        self._keys = {}
+        self.bitmaps = SlotBitmaps()
+
+    def encode(self, value):
+        code = self.code_of.get(value)
+        if code is None:
+            code = self.code_of[value] = len(self.values)
+            self.values.append(value)
+            if code == 256:
+                self.codes = array('H', iter(self.codes))
+            elif code == 65536:
+                self.codes = array('I', iter(self.codes))
+        return code
+
+    def append(self, value):
+        code = self.encode(value)
+        self.bitmaps.changing(len(self.codes))
+        self.codes.append(code)
+
+    def set(self, slot, value):
+        code = self.encode(value)
+        self.bitmaps.changing(slot, self.codes[slot])
+        self.codes[slot] = code
+
+    def codes_for(self, values):
+        return [self.code_of[v] for v in values if v in self.code_of]
+
+    def mask(self, values):
+        # True/1 for each row holding one of values: a NumPy bool array
+        # when NumPy is available, otherwise one 0/1 byte per row
+        wanted = self.codes_for(values)
+        if numpy is not None:
+            table = numpy.zeros(len(self.values) or 1, dtype=bool)
+            table[wanted] = True
+            # The frombuffer view is dropped before returning; the column
+            # cannot grow while a view of it exists
+            return table[numpy.frombuffer(self.codes, dtype=numpy.uint8 if isinstance(self.codes, bytearray)
+                                          else self.codes.typecode)]
+        wanted = set(wanted)
+        if isinstance(self.codes, bytearray):
+            return self.codes.translate(bytes(code in wanted for code in range(256)))
+        return bytearray(code in wanted for code in self.codes)
+
+    def bitmap(self, values):
+        # Rows holding one of values, as SlotBitmaps bits
+        bits = 0
+        for code in self.codes_for(values):
+            bits |= self.bitmaps.get(self.codes, code)
+        return bits
+
+    def value_counts(self, rows):
+        # {value: number of rows in the bitmap rows holding it}
+        return {value: (rows & self.bitmaps.get(self.codes, code)).bit_count()
+                for code, value in enumerate(self.values)}
+
+    def keys(self, key):
+        # key(value) for every code, computed once per distinct value
+        keys = self._keys.get(key)
+        if keys is None:
+            keys = self._keys[key] = []
+        if len(keys) < len(self.values):
+            keys.extend(map(key, self.values[len(keys):]))
+        return keys
+
+class Descending:
+    # Inverts the ordering of a sort key, for bisecting descending orders
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+ORDER_REBUILD_CHANGES = 1000
+
+class SortedOrder:
+    # The slots of a StudentColumns in one sort option's order, kept sorted
+    # as rows change. Changed and new slots are queued and merged in when
+    # the order is next read: each is placed by bisect on its keys
+    # (precomputed per distinct value by CodedColumn.keys), or the order is
+    # rebuilt when more than ORDER_REBUILD_CHANGES are queued (bulk edits).
+    # Ties stay in slot order for descending orders too, as a stable sort
+    # leaves them. Dead slots stay in until the next rebuild; queries mask
+    # them out.
+    def __init__(self, columns, parts, reverse):
+        self.parts = [(columns[name], value_key) for name, value_key in parts]
+        self.reverse = reverse
+        self.slots = array('i')
+        self.moved = set()
+        self.inserted = set()
+
+    def key(self, slot):
+        return tuple(column.keys(value_key)[column.codes[slot]] for column, value_key in self.parts)
+
+    def _position_key(self, slot):
+        key = self.key(slot)
+        return (Descending(key) if self.reverse else key), slot
+
+    def build(self, slots):
+        # slots in ascending order; reverse sorts are stable as well
+        self.slots = array('i', sorted(slots, key=self.key, reverse=self.reverse))
+        self.moved = set()
+        self.inserted = set()
+
+    def insert(self, slot):
+        self.inserted.add(slot)
+
+    def remove(self, slot):
+        self.moved.add(slot)
+        self.inserted.discard(slot)
+
+    def current(self, alive):
+        if len(self.moved) + len(self.inserted) > ORDER_REBUILD_CHANGES:
+            self.build(slot for slot, live in enumerate(alive) if live)
+        elif self.moved or self.inserted:
+            if self.moved:
+                keep = bytearray(b'\x01') * len(alive)
+                for slot in self.moved:
+                    keep[slot] = 0
+                self.slots = array('i', compress(self.slots, map(keep.__getitem__, self.slots)))
+            for slot in sorted(self.inserted):
+                self.slots.insert(bisect_right(self.slots, self._position_key(slot), key=self._position_key), slot)
+            self.moved = set()
+            self.inserted = set()
+        return self.slots
+
+COLUMN_COMPACT_MIN = 1024
+
+class StudentColumns:
+    # Column-oriented copy of the fields the student table filters and
+    # sorts by, used by StudentRepository.query. Every student has a slot
+    # (in repository order) and each column stores one code per slot, so a
+    # filter is a byte mask per column combined in C, or with NumPy when it
+    # is installed, instead of a Python loop over the records. Each sort
+    # option used so far keeps a SortedOrder of the slots, so a sorted
+    # query filters that order instead of sorting. Deleted
+    # students leave a dead slot until more than half the slots are dead.
+    #
+    # facet_counts counts the students per value of the filter columns
+    # through their SlotBitmaps, one & and bit_count() per value.
+    COLUMNS = ('college', 'program', 'gender', 'year', 'last_name', 'first_name')
+
+    def __init__(self):
+        self.rebuild(())
+
+    def rebuild(self, students):
+        self.records = []
+        self.slot_of = {}
+        self.alive = bytearray()
+        self.alive_bitmaps = SlotBitmaps()
+        self.dead = 0
+        self.columns = {name: CodedColumn() for name in self.COLUMNS}
+        self.orders = {}
+        for student in students:
+            self.add(student)
+
+    def add(self, student):
+        slot = self.slot_of[student.student_id] = len(self.records)
+        self.records.append(student)
+        self.alive_bitmaps.changing(slot)
+        self.alive.append(1)
+        for name, column in self.columns.items():
+            column.append(getattr(student, name))
+        for order in self.orders.values():
+            order.insert(slot)
+
+    def replace(self, old, student):
+        # Same Student ID: overwrite the slot so the row keeps its place
+        slot = self.slot_of.get(old.student_id)
+        if slot is None:
+            return self.add(student)
+        self.records[slot] = student
+        for name, column in self.columns.items():
+            column.set(slot, getattr(student, name))
+        for order in self.orders.values():
+            order.remove(slot)
+            order.insert(slot)
+
+    def remove(self, student):
+        slot = self.slot_of.pop(student.student_id, None)
+        if slot is None:
+            return
+        self.records[slot] = None
+        self.alive_bitmaps.changing(slot, 1)
+        self.alive[slot] = 0
+        self.dead += 1
+
+    def order(self, sort):
+        # The SortedOrder for a STUDENT_SORTS entry, built on first use
+        order = self.orders.get((sort[3], sort[2]))
+        if order is None:
+            order = self.orders[(sort[3], sort[2])] = SortedOrder(self.columns, sort[3], sort[2])
+            order.build(slot for slot, alive in enumerate(self.alive) if alive)
+        return order
+
+    def _compact(self):
+        if self.dead > COLUMN_COMPACT_MIN and self.dead * 2 > len(self.records):
+            self.rebuild([student for student in self.records if student is not None])
+
+    @staticmethod
+    def _filters(colleges, programs, gender, year):
+        # {column name: values to keep} for the filters that are set
+        return {name: values for name, values in
+                (("college", colleges), ("program", programs),
+                 ("gender", None if gender is None else (gender,)),
+                 ("year", None if year is None else (year,)))
+                if values is not None}
+
+    def query(self, colleges=None, programs=None, gender=None, sort_option=None, student_ids=None, year=None):
+        # colleges/programs are catalog objects to keep and gender/year a
+        # value; None means no restriction. student_ids limits the candidates.
+        self._compact()
+        filters = [(self.columns[name], values) for name, values in
+                   self._filters(colleges, programs, gender, year).items()]
+        sort = STUDENT_SORTS.get(sort_option)
+        candidates = None
+        if student_ids is not None:
+            candidates = [self.slot_of[i] for i in student_ids if i in self.slot_of]
+
+        if numpy is not None:
+            mask = numpy.frombuffer(self.alive, dtype=numpy.uint8).astype(bool)
+            for column, values in filters:
+                mask &= column.mask(values)
+            if candidates is not None:
+                wanted = numpy.zeros(len(mask), dtype=bool)
+                wanted[candidates] = True
+                mask &= wanted
+            count = int(numpy.count_nonzero(mask))
+        else:
+            mask = self.alive
+            for column, values in filters:
+                mask = and_masks(mask, column.mask(values))
+            if candidates is not None:
+                wanted = bytearray(len(mask))
+                for slot in candidates:
+                    wanted[slot] = 1
+                mask = and_masks(mask, wanted)
+            count = mask.count(1)
+
+        # A large result is read off the maintained order; a small one
+        # (narrow filters, search matches) is cheaper to sort directly
+        order = None if sort is None else self.order(sort)
+        if order is not None and count * 32 >= len(self.records):
+            if numpy is not None:
+                # The frombuffer view is gone before the order can change
+                slots = numpy.frombuffer(order.current(self.alive), dtype=numpy.int32)
+                slots = slots[mask[slots]].tolist()
+            else:
+                ordered = order.current(self.alive)
+                slots = list(compress(ordered, map(mask.__getitem__, ordered)))
+        else:
+            if numpy is not None:
+                slots = numpy.flatnonzero(mask).tolist()
+            else:
+                slots = list(compress(range(len(mask)), mask))
+            if order is not None:
+                slots.sort(key=order.key, reverse=sort[2])
+        return list(map(self.records.__getitem__, slots))
+
+    def facet_counts(self, colleges=None, programs=None, gender=None, year=None):
+        # {column: {value: count}} for each of FACETS, counting the students
+        # that pass the filters on the other columns (filters as in query)
+        self._compact()
+        filters = {name: self.columns[name].bitmap(values)
+                   for name, values in self._filters(colleges, programs, gender, year).items()}
+        alive = self.alive_bitmaps.get(self.alive, 1)
+        counts = {}
+        for facet in FACETS:
+            rows = alive
+            for name, bits in filters.items():
+                if name != facet:
+                    rows &= bits
+            counts[facet] = self.columns[facet].value_counts(rows)
+        return counts
+
+class FieldCounter:
+    # Number of rows per key(row), maintained as rows are added and removed
+    # so count lookups are O(1).
+    def __init__(self, key):
+        self.key = key
+        self.counts = defaultdict(int)
+        self.total = 0
+
+    def add(self, row):
+        self.counts[self.key(row)] += 1
+        self.total += 1
+
+    def remove(self, row):
+        key = self.key(row)
+        if key in self.counts:
+            self.counts[key] -= 1
+            self.total -= 1
+            if self.counts[key] <= 0:
+                del self.counts[key]
+
+    def rebuild(self, rows):
+        self.counts = defaultdict(int)
+        self.total = 0
+        for row in rows:
+            self.add(row)
+
+    def get(self, key):
+        return self.counts.get(key, 0)
+
+class FieldGroups(FieldCounter):
+    # FieldCounter that also keeps the rows under each key, so they can be
+    # looked up without a scan
+    def __init__(self, key):
+        self.groups = defaultdict(list)
+        super().__init__(key)
+
+    def add(self, row):
+        super().add(row)
+        self.groups[self.key(row)].append(row)
+
+    def remove(self, row):
+        super().remove(row)
+        key = self.key(row)
+        rows = self.groups.get(key)
+        if rows is not None and row in rows:
+            rows.remove(row)
+            if not rows:
+                del self.groups[key]
+
+    def rebuild(self, rows):
+        self.groups = defaultdict(list)
+        super().rebuild(rows)
+
+    def rows(self, key):
+        return list(self.groups.get(key, ()))
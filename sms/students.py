@@ -0,0 +1,786 @@
+# Student records, their storage backends (CSV with a journal, or
+# SQLite) and StudentRepository, the in-memory copy every caller goes
+# through.
+from collections import defaultdict
+import csv
+import json
+from operator import attrgetter
+import os
+import re
+import sqlite3
+import sys
+import threading
+
+from .catalog import Catalog
+from .files import (CSV_CHUNK_ROWS, STUDENT_CSV, append_file, chunked, commit_file, file_stamp, iter_csv,
+                    remove_file, transaction, write_csv_chunks)
+from .query import FACETS, FACET_ALL, FACET_NAMES, STUDENT_SORTS
+
+STUDENT_FIELDS = ["Student ID", "Last Name", "First Name", "Gender", "College",
+                  "College Code", "Program", "Program Code", "Year"]
+STUDENT_ID_RE = re.compile(r"^\d{4}-\d{4}$")
+
+def validate_student_data(data):
+    errors = []
+
+    if not STUDENT_ID_RE.match(data["id"]) or any(char.isalpha() for char in data["id"]):
+        errors.append("• ID No. must be in the format XXXX-XXXX (e.g., 2024-1234) and contain only numbers.")
+
+    for name_field in ["last_name", "first_name"]:
+        value = data[name_field].title()
+        if any(char.isdigit() for char in value):
+            errors.append(f"• {name_field.replace('_', ' ').title()} must not contain numbers.")
+        if not all(char.isalpha() or char in [' ', '-'] for char in value):
+            errors.append(f"• {name_field.replace('_', ' ').title()} must contain only letters, spaces, or hyphens.")
+
+    if data["gender"] == "Select":
+        errors.append("• Please select a Gender.")
+
+    if data["year"] == "Select":
+        errors.append("• Please select a Year Level.")
+
+    if data["college"] == "Select":
+        errors.append("• Please select a College.")
+
+    if data["program"] == "Select":
+        errors.append("• Please select a Program.")
+
+    return errors
+
+class StudentRecord:
+    # One student. college and program are references into the Catalog, so
+    # the names and codes shown are always the current ones; to_row() gives
+    # the flat students.csv layout used for storage and export.
+    #
+    # Kept small since there is one per student: no per-instance __dict__,
+    # and the values that repeat across rows (gender, year, common names)
+    # are interned so every record shares one copy of each string.
+    __slots__ = ('student_id', 'last_name', 'first_name', 'gender', 'year', 'college', 'program')
+
+    def __init__(self, student_id, last_name, first_name, gender, year, college, program):
+        self.student_id = student_id
+        self.last_name = sys.intern(last_name)
+        self.first_name = sys.intern(first_name)
+        self.gender = sys.intern(gender)
+        self.year = sys.intern(year)
+        self.college = college
+        self.program = program
+
+    @classmethod
+    def from_row(cls, row, catalog):
+        college = catalog.college_ref(row.get('College'), row.get('College Code'))
+        program = catalog.program_ref(row.get('Program'), row.get('Program Code'), college)
+        return cls(row.get('Student ID') or '', row.get('Last Name') or '', row.get('First Name') or '',
+                   row.get('Gender') or '', row.get('Year') or '', college, program)
+
+    def __getitem__(self, field):
+        return STUDENT_GETTERS[field](self)
+
+    def get(self, field, default=None):
+        getter = STUDENT_GETTERS.get(field)
+        return default if getter is None else getter(self)
+
+    def to_row(self):
+        return {field: getter(self) for field, getter in STUDENT_GETTERS.items()}
+
+STUDENT_GETTERS = dict(zip(STUDENT_FIELDS, map(attrgetter, [
+    "student_id", "last_name", "first_name", "gender", "college.name",
+    "college.code", "program.name", "program.code", "year"])))
+
+def student_row_chunks(students, size=CSV_CHUNK_ROWS):
+    # StudentRecords to students.csv rows, converted a chunk at a time
+    return chunked(map(StudentRecord.to_row, students), size)
+
+STUDENT_JOURNAL = 'students.journal'
+JOURNAL_COMPACT_THRESHOLD = 1000
+LOAD_CHUNK_ROWS = 2000
+
+class StudentJournal:
+    # Append-only log of student inserts/updates/deletes. Each line is one
+    # JSON operation; students.csv only gets rewritten when the log is compacted.
+    def __init__(self, file_path=STUDENT_JOURNAL):
+        self.file_path = file_path
+        self.pending_path = file_path + '.compacting'
+        self.count = 0
+
+    def append(self, entries, on_commit=None):
+        # Inside a WriteGroup the entries only reach the file when the
+        # group commits (see append_file)
+        data = ''.join(json.dumps(entry) + '\n' for entry in entries).encode('utf-8')
+        append_file(self.file_path, data, on_commit)
+        self.count += len(entries)
+
+    def changes(self, repair=True):
+        # The net effect of the logged operations as {Student ID: row, or
+        # None if deleted}, and how many came from the live journal.
+        # repair=False leaves a torn trailing line alone, for readers on
+        # another thread while we may be appending.
+        changes = {}
+        count = 0
+        for path in (self.pending_path, self.file_path):
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            except FileNotFoundError:
+                continue
+            lines = data.split(b'\n')
+            torn = lines.pop()
+            if torn and repair:
+                # Half-written trailing line from a crash mid-append; cut it off
+                # so the next append starts on a clean line.
+                with open(path, 'r+b') as f:
+                    f.truncate(len(data) - len(torn))
+            for line in lines:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                apply_journal_entry(changes, entry)
+                if path == self.file_path:
+                    count += 1
+        return changes, count
+
+    def replay(self, students, repair=True):
+        # Applies the logged operations to students and returns how many
+        # came from the live journal
+        changes, count = self.changes(repair)
+        for student_id, row in changes.items():
+            if row is None:
+                students.pop(student_id, None)
+            else:
+                students[student_id] = row
+        return count
+
+    def rotate(self):
+        # Start a fresh log; the old one is kept until the compacted CSV is in place
+        if os.path.exists(self.pending_path) and os.path.exists(self.file_path):
+            # An earlier compaction never got its CSV in place; keep its
+            # entries ahead of ours instead of replacing them
+            with open(self.file_path, 'rb') as f:
+                data = f.read()
+            with open(self.pending_path, 'ab') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.remove(self.file_path)
+        elif os.path.exists(self.file_path):
+            os.replace(self.file_path, self.pending_path)
+        self.count = 0
+
+    def discard_rotated(self):
+        if os.path.exists(self.pending_path):
+            os.remove(self.pending_path)
+
+def apply_journal_entry(changes, entry):
+    if entry.get('op') == 'put':
+        student = entry['student']
+        changes[student['Student ID']] = student
+    elif entry.get('op') == 'delete':
+        changes[entry['id']] = None
+
+class CsvStudentStorage:
+    # Default storage: students.csv plus the edit journal. Edits are appended
+    # to the journal and folded back into the CSV in the background once the
+    # journal grows past JOURNAL_COMPACT_THRESHOLD.
+    def __init__(self, file_path=STUDENT_CSV, journal_path=STUDENT_JOURNAL,
+                 compact_threshold=JOURNAL_COMPACT_THRESHOLD):
+        self.file_path = file_path
+        self.journal = StudentJournal(journal_path)
+        self.compact_threshold = compact_threshold
+        self._compactor = None
+        self.stamps = None
+        self.loading = False
+        self._read_all = False
+
+    def load(self):
+        students = {}
+        for chunk in self.load_chunks():
+            students.update(chunk)
+        self.loaded()
+        return students
+
+    def load_chunks(self, size=LOAD_CHUNK_ROWS):
+        # The stored students as lists of (Student ID, row), in file order
+        # with the journal already applied. Also run on the background
+        # loader thread, so nothing may be logged until it is exhausted.
+        # Until loaded() the repository only holds part of the students, so
+        # no snapshot of it may replace students.csv; a read that fails
+        # part-way keeps it that way.
+        self.loading = True
+        self._read_all = False
+        self.wait_for_compaction()
+        self.stamps = self.file_stamps()
+        changes, self.journal.count = self.journal.changes()
+        yield from chunked(self._stored_rows(changes), size)
+        self._read_all = True
+
+    def _stored_rows(self, changes):
+        for row in iter_csv(self.file_path):
+            student_id = (row.get('Student ID') or '').strip()
+            if not student_id:
+                continue
+            if student_id in changes:
+                row = changes.pop(student_id)
+                if row is None:
+                    continue
+            yield student_id, row
+        # Students that were only ever added through the journal
+        for student_id, row in changes.items():
+            if row is not None:
+                yield student_id, row
+
+    def loaded(self):
+        # Every chunk from load_chunks() is in the repository
+        self.loading = not self._read_all
+
+    def read_rows(self):
+        # students.csv as {Student ID: row}, without the journal
+        students = {}
+        for row in iter_csv(self.file_path):
+            student_id = (row.get('Student ID') or '').strip()
+            if student_id:
+                students[student_id] = row
+        return students
+
+    def read_external(self):
+        # Current stored state for the file watcher, read off the Tk
+        # thread: students.csv plus the journal, with no side effects
+        students = self.read_rows()
+        self.journal.replay(students, repair=False)
+        return students
+
+    def log(self, entries, students):
+        self.journal.append(entries, on_commit=self._journal_written)
+        if self.journal.count >= self.compact_threshold and not self.loading:
+            self.compact(students, background=True)
+
+    def changed_on_disk(self):
+        # True when students.csv or the journal no longer match what we
+        # last loaded or wrote, i.e. another program changed them. Each of
+        # our own writes only updates the stamp of the file it wrote.
+        return self.file_stamps() != self.stamps
+
+    def file_stamps(self):
+        return (file_stamp(self.file_path), file_stamp(self.journal.file_path))
+
+    def save(self, students):
+        self.compact(students, background=False)
+
+    def compact(self, students, background=False):
+        if self.loading:
+            raise ValueError("Students are still loading; students.csv was not rewritten.")
+        if self._compactor is not None and self._compactor.is_alive():
+            if background:
+                return
+            self.wait_for_compaction()
+        self.journal.rotate()
+        self.stamps = (self.stamps[0], file_stamp(self.journal.file_path))
+        if background:
+            # The thread needs its own list since students keeps changing;
+            # the records themselves are replaced rather than edited, and
+            # are only turned into rows a chunk at a time as they are written
+            records = list(students.values())
+            self._compactor = threading.Thread(target=self._write_snapshot, args=(records,), daemon=True)
+            self._compactor.start()
+        else:
+            self._write_snapshot(students.values())
+
+    def close(self, students):
+        # Fold any outstanding journal entries into the CSV before exiting.
+        # A load that never finished leaves the journal as it is, to be
+        # replayed on the next start.
+        self.wait_for_compaction()
+        if self.journal.count and not self.loading:
+            self.compact(students)
+
+    def wait_for_compaction(self):
+        if self._compactor is not None:
+            self._compactor.join()
+            self._compactor = None
+
+    def _write_snapshot(self, students):
+        write_csv_chunks(self.file_path, STUDENT_FIELDS, student_row_chunks(students),
+                         on_commit=self._snapshot_written)
+
+    def _journal_written(self):
+        self.stamps = (self.stamps[0], file_stamp(self.journal.file_path))
+
+    def _snapshot_written(self):
+        self.stamps = (file_stamp(self.file_path), self.stamps[1])
+        self.journal.discard_rotated()
+
+STUDENT_DB = 'students.db'
+STUDENT_COLUMNS = ["student_id", "last_name", "first_name", "gender", "college",
+                   "college_code", "program", "program_code", "year"]
+STUDENT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS students (
+    student_id TEXT PRIMARY KEY,
+    last_name TEXT NOT NULL DEFAULT '',
+    first_name TEXT NOT NULL DEFAULT '',
+    gender TEXT NOT NULL DEFAULT '',
+    college TEXT NOT NULL DEFAULT '',
+    college_code TEXT NOT NULL DEFAULT '',
+    program TEXT NOT NULL DEFAULT '',
+    program_code TEXT NOT NULL DEFAULT '',
+    year TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_students_college_code ON students(college_code);
+CREATE INDEX IF NOT EXISTS idx_students_program_code ON students(program_code);
+CREATE INDEX IF NOT EXISTS idx_students_college ON students(college);
+CREATE INDEX IF NOT EXISTS idx_students_program ON students(program);
+CREATE INDEX IF NOT EXISTS idx_students_last_name ON students(last_name COLLATE NOCASE, first_name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_students_first_name ON students(first_name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_students_gender ON students(gender);
+"""
+STUDENT_UPSERT = (
+    f"INSERT INTO students ({', '.join(STUDENT_COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in STUDENT_COLUMNS)}) "
+    f"ON CONFLICT(student_id) DO UPDATE SET "
+    + ", ".join(f"{c} = excluded.{c}" for c in STUDENT_COLUMNS[1:])
+)
+
+def student_params(student):
+    return [student.get(field) or '' for field in STUDENT_FIELDS]
+
+def open_student_db(db_path=STUDENT_DB):
+    conn = sqlite3.connect(db_path)
+    conn.executescript(STUDENT_SCHEMA)
+    return conn
+
+def import_students_csv(csv_path=STUDENT_CSV, db_path=STUDENT_DB):
+    # One-shot load of a students CSV into the SQLite database; rows with an
+    # existing Student ID overwrite it. Returns the number of rows read.
+    conn = open_student_db(db_path)
+    count = 0
+    try:
+        with conn, open(csv_path, newline='', encoding='utf-8') as f:
+            rows = (student_params(row) for row in csv.DictReader(f)
+                    if (row.get('Student ID') or '').strip())
+            for params in rows:
+                conn.execute(STUDENT_UPSERT, params)
+                count += 1
+    finally:
+        conn.close()
+    return count
+
+def export_students_csv(db_path=STUDENT_DB, csv_path=STUDENT_CSV):
+    # Writes the SQLite student table back out in the students.csv layout
+    conn = open_student_db(db_path)
+    temp_path = csv_path + '.tmp'
+    try:
+        with open(temp_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(STUDENT_FIELDS)
+            writer.writerows(conn.execute(f"SELECT {', '.join(STUDENT_COLUMNS)} FROM students ORDER BY rowid"))
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        remove_file(temp_path)
+        raise
+    finally:
+        conn.close()
+    commit_file(temp_path, csv_path)
+
+class SqliteStudentStorage:
+    # Students in a local SQLite file with indexes on the columns the table
+    # filters and sorts by. The first run imports students.csv, and
+    # students.csv is re-exported on close so CSV interchange keeps working.
+    def __init__(self, db_path=STUDENT_DB, csv_path=STUDENT_CSV):
+        self.db_path = db_path
+        self.csv_path = csv_path
+        if not os.path.exists(db_path) and os.path.exists(csv_path):
+            import_students_csv(csv_path, db_path)
+        self.conn = open_student_db(db_path)
+        self.dirty = False
+        self.data_version = None
+
+    def load(self):
+        self.data_version = self._data_version()
+        cursor = self.conn.execute(f"SELECT {', '.join(STUDENT_COLUMNS)} FROM students ORDER BY rowid")
+        return {row[0]: dict(zip(STUDENT_FIELDS, row)) for row in cursor}
+
+    def load_chunks(self, size=LOAD_CHUNK_ROWS):
+        # Same rows as load(), a chunk at a time. It has its own connection
+        # since it runs on the background loader thread; loaded() then
+        # records the data_version on ours.
+        conn = open_student_db(self.db_path)
+        try:
+            cursor = conn.execute(f"SELECT {', '.join(STUDENT_COLUMNS)} FROM students ORDER BY rowid")
+            while True:
+                rows = cursor.fetchmany(size)
+                if not rows:
+                    break
+                yield [(row[0], dict(zip(STUDENT_FIELDS, row))) for row in rows]
+        finally:
+            conn.close()
+
+    def loaded(self):
+        self.data_version = self._data_version()
+
+    def log(self, entries, students):
+        # Inside a WriteGroup the rows commit with the group's files
+        with transaction(self.conn):
+            for entry in entries:
+                if entry['op'] == 'put':
+                    self.conn.execute(STUDENT_UPSERT, student_params(entry['student']))
+                elif entry['op'] == 'delete':
+                    self.conn.execute("DELETE FROM students WHERE student_id = ?", (entry['id'],))
+        self.dirty = True
+
+    def changed_on_disk(self):
+        # data_version only moves when another connection commits
+        return self._data_version() != self.data_version
+
+    def _data_version(self):
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def save(self, students):
+        with transaction(self.conn):
+            self.conn.execute("DELETE FROM students")
+            self.conn.executemany(STUDENT_UPSERT, map(student_params, students.values()))
+        self.dirty = True
+
+    def close(self, students):
+        # Exported from memory: an outside edit to colleges.csv or
+        # programs.csv renames without touching the database, so only the
+        # codes are authoritative there. The connection is closed either way.
+        try:
+            if self.dirty:
+                write_csv_chunks(self.csv_path, STUDENT_FIELDS, student_row_chunks(students.values()))
+                self.dirty = False
+        finally:
+            self.conn.close()
+
+    def query(self, college_codes, program_codes, gender, sort_option, year="All Years"):
+        # Filtering and ordering run in SQL; returns Student IDs in order.
+        # college_codes/program_codes of None mean no restriction.
+        where, params = [], []
+        for column, codes in (("college_code", college_codes), ("program_code", program_codes)):
+            if codes is not None:
+                where.append(f"{column} IN ({', '.join('?' for _ in codes)})")
+                params.extend(codes)
+        for column, value, everything in (("gender", gender, "All Genders"), ("year", year, "All Years")):
+            if value != everything:
+                where.append(f"{column} = ?")
+                params.append(value)
+        sql = "SELECT student_id FROM students"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sort = STUDENT_SORTS.get(sort_option)
+        if sort is not None:
+            sql += f" ORDER BY {sort[1]}, rowid"
+        return [row[0] for row in self.conn.execute(sql, params)]
+
+def make_student_storage():
+    # SMS_STORAGE=sqlite switches to the SQLite backend (SMS_DATABASE sets its path)
+    if os.environ.get('SMS_STORAGE', 'csv').lower() == 'sqlite':
+        return SqliteStudentStorage(os.environ.get('SMS_DATABASE', STUDENT_DB))
+    return CsvStudentStorage()
+
+def student_matches(student, college, program, gender, year="All Years"):
+    return ((college == "All Colleges" or student["College"] == college) and
+            (program == "All Programs" or student["Program"] == program) and
+            (gender == "All Genders" or student["Gender"] == gender) and
+            (year == "All Years" or student["Year"] == year))
+
+def diff_student_rows(students, rows):
+    # What changed between the records in memory and freshly read rows
+    # (both keyed by Student ID): ([(id, row) added or changed], [ids gone]).
+    # Safe to run off the Tk thread as it only reads from students.
+    changed = []
+    for student_id, row in rows.items():
+        student = students.get(student_id)
+        if student is None or any(student[field] != (row.get(field) or '') for field in STUDENT_FIELDS):
+            changed.append((student_id, row))
+    deleted = [student_id for student_id in list(students) if student_id not in rows]
+    return changed, deleted
+
+class StudentRepository:
+    # Every student is kept in memory keyed by Student ID, so lookups,
+    # duplicate checks and edits never have to re-read the storage. The
+    # storage backend (CSV + journal, or SQLite) only sees the edits, as
+    # flat students.csv rows; in memory every student is a StudentRecord
+    # pointing into the catalog.
+    #
+    # preload=False starts out empty for a caller that fills it with
+    # begin_load()/load_chunk()/finish_load() instead (the GUI's
+    # BackgroundLoader).
+    def __init__(self, storage=None, catalog=None, preload=True):
+        self.storage = storage if storage is not None else CsvStudentStorage()
+        self.catalog = catalog if catalog is not None else Catalog()
+        self.students = {}
+        self.indexes = []
+        self.query_index = None
+        if preload:
+            self.load()
+
+    def add_index(self, index):
+        # Indexes expose add(student), remove(student) and rebuild(students)
+        # and are kept in step with every mutation; replace(old, new), if
+        # present, is used when a student is overwritten under the same ID.
+        # An index with query() answers filter/sort queries in place of the
+        # scan over the records.
+        self.indexes.append(index)
+        if hasattr(index, 'query'):
+            self.query_index = index
+        index.rebuild(self.students.values())
+
+    def load(self):
+        self.students = {student_id: StudentRecord.from_row(row, self.catalog)
+                         for student_id, row in self.storage.load().items()}
+        self._reindex()
+
+    def begin_load(self):
+        self.students = {}
+        self._reindex()
+
+    def load_chunk(self, rows):
+        # One chunk of (Student ID, row) from storage.load_chunks()
+        for student_id, row in rows:
+            student = StudentRecord.from_row(row, self.catalog)
+            old = self.students.get(student_id)
+            self.students[student_id] = student
+            if old is not None:
+                self._reindex_one(old, student)
+            else:
+                self._index(student)
+
+    def finish_load(self):
+        hook = getattr(self.storage, 'loaded', None)
+        if hook is not None:
+            hook()
+
+    def refresh(self):
+        # Re-load only if the stored students were changed by someone else
+        if self.storage.changed_on_disk():
+            self.load()
+        return self
+
+    def __len__(self):
+        return len(self.students)
+
+    def __contains__(self, student_id):
+        return student_id in self.students
+
+    def get(self, student_id):
+        return self.students.get(student_id)
+
+    def all(self):
+        return list(self.students.values())
+
+    def query(self, college="All Colleges", program="All Programs", gender="All Genders",
+              sort_option=None, student_ids=None, year="All Years"):
+        # Filtered and sorted students. Backends that can filter/sort
+        # themselves (SQLite) do so; otherwise it runs over the memory copy.
+        # student_ids optionally narrows the candidates (e.g. search matches).
+        if student_ids is None and hasattr(self.storage, 'query'):
+            # Only the codes in storage are sure to be current (see
+            # close()), so the name filters are resolved to codes through
+            # the catalog first
+            college_codes = None if college == "All Colleges" else [c.code for c in self.catalog.colleges_named(college)]
+            program_codes = None if program == "All Programs" else [p.code for p in self.catalog.programs_named(program)]
+            ids = self.storage.query(college_codes, program_codes, gender, sort_option, year)
+            return [self.students[i] for i in ids if i in self.students]
+        if self.query_index is not None:
+            return self.query_index.query(**self._column_filters(college, program, gender, year),
+                                          sort_option=sort_option, student_ids=student_ids)
+        if student_ids is None:
+            candidates = self.students.values()
+        else:
+            candidates = [self.students[i] for i in student_ids if i in self.students]
+        students = [s for s in candidates if student_matches(s, college, program, gender, year)]
+        sort = STUDENT_SORTS.get(sort_option)
+        if sort is not None:
+            students.sort(key=sort[0], reverse=sort[2])
+        return students
+
+    def _column_filters(self, college, program, gender, year):
+        # The filter dropdown values as StudentColumns filters (None = all)
+        return {'colleges': None if college == "All Colleges" else self.catalog.colleges_named(college),
+                'programs': None if program == "All Programs" else self.catalog.programs_named(program),
+                'gender': None if gender == "All Genders" else gender,
+                'year': None if year == "All Years" else year}
+
+    def facet_counts(self, college="All Colleges", program="All Programs", gender="All Genders", year="All Years"):
+        # Students per college, program, gender and year name for the other
+        # filters as set, e.g. {'gender': {'Female': 12, ...}, ...}: what
+        # each filter dropdown choice would match. Counted on the column
+        # index (any backend keeps one); without it by a scan.
+        filters = (college, program, gender, year)
+        counts = {facet: defaultdict(int) for facet in FACETS}
+        if self.query_index is not None:
+            for facet, value_counts in self.query_index.facet_counts(**self._column_filters(*filters)).items():
+                name = FACET_NAMES[facet]
+                for value, count in value_counts.items():
+                    if count:
+                        counts[facet][name(value)] += count
+            return counts
+        for student in self.students.values():
+            values = (student["College"], student["Program"], student["Gender"], student["Year"])
+            for i, facet in enumerate(FACETS):
+                if student_matches(student, *(FACET_ALL[f] if f == facet else v for f, v in zip(FACETS, filters))):
+                    counts[facet][values[i]] += 1
+        return counts
+
+    def add(self, student):
+        student_id = student.student_id
+        if student_id in self.students:
+            raise ValueError(f"A student with ID {student_id} already exists.")
+        self.put(student)
+
+    def add_many(self, students):
+        # Batch add (bulk import): one storage write for all of them
+        for student in students:
+            if student.student_id in self.students:
+                raise ValueError(f"A student with ID {student.student_id} already exists.")
+        for student in students:
+            self.students[student.student_id] = student
+            self._index(student)
+        if students:
+            self.storage.log([{'op': 'put', 'student': s.to_row()} for s in students], self.students)
+
+    def put(self, student):
+        # Insert or overwrite the student with the same ID
+        old = self.students.get(student.student_id)
+        self.students[student.student_id] = student
+        if old is not None:
+            self._reindex_one(old, student)
+        else:
+            self._index(student)
+        self.storage.log([{'op': 'put', 'student': student.to_row()}], self.students)
+
+    def update(self, old_id, student):
+        if old_id not in self.students:
+            raise ValueError(f"Student ID {old_id} not found.")
+        new_id = student.student_id
+        old = self.students[old_id]
+        entries = []
+        if new_id != old_id:
+            if new_id in self.students:
+                raise ValueError(f"A student with ID {new_id} already exists.")
+            del self.students[old_id]
+            entries.append({'op': 'delete', 'id': old_id})
+            self._unindex(old)
+            self.students[new_id] = student
+            self._index(student)
+        else:
+            self.students[new_id] = student
+            self._reindex_one(old, student)
+        entries.append({'op': 'put', 'student': student.to_row()})
+        self.storage.log(entries, self.students)
+
+    def delete(self, student_id):
+        student = self.students.pop(student_id, None)
+        if student is None:
+            raise ValueError(f"Student ID {student_id} not found.")
+        self._unindex(student)
+        self.storage.log([{'op': 'delete', 'id': student_id}], self.students)
+
+    def update_many(self, students):
+        # Batch overwrite of existing students under their own IDs (bulk
+        # edits): one storage write for all of them
+        for student in students:
+            if student.student_id not in self.students:
+                raise ValueError(f"Student ID {student.student_id} not found.")
+        for student in students:
+            old = self.students[student.student_id]
+            self.students[student.student_id] = student
+            self._reindex_one(old, student)
+        if students:
+            self.storage.log([{'op': 'put', 'student': s.to_row()} for s in students], self.students)
+
+    def delete_many(self, student_ids):
+        missing = [i for i in student_ids if i not in self.students]
+        if missing:
+            raise ValueError(f"Student ID {missing[0]} not found.")
+        for student_id in student_ids:
+            self._unindex(self.students.pop(student_id))
+        if student_ids:
+            self.storage.log([{'op': 'delete', 'id': i} for i in student_ids], self.students)
+
+    def students_of(self, college=None, program=None):
+        # Students referencing the catalog college and/or program, found
+        # through the column index when there is one
+        if self.query_index is not None:
+            return self.query_index.query(None if college is None else [college],
+                                          None if program is None else [program])
+        return [s for s in self.students.values()
+                if (college is None or s.college is college) and (program is None or s.program is program)]
+
+    def rewrite(self, students):
+        # Logs the stored rows of unchanged records again, after a catalog
+        # rename changed the names or codes those rows repeat. Only these
+        # students are written, in the caller's WriteGroup if there is one.
+        if students:
+            self.storage.log([{'op': 'put', 'student': s.to_row()} for s in students], self.students)
+
+    def repoint(self, students, college=None, program=None):
+        # Moves students to another college and/or program (e.g. N/A when
+        # theirs is deleted). Each gets a new record and only its index
+        # entries are updated; only the moved students are logged, in the
+        # caller's WriteGroup if there is one.
+        moved = []
+        for old in students:
+            student = StudentRecord(old.student_id, old.last_name, old.first_name, old.gender, old.year,
+                                    college or old.college, program or old.program)
+            self.students[old.student_id] = student
+            self._reindex_one(old, student)
+            moved.append(student)
+        if moved:
+            self.storage.log([{'op': 'put', 'student': s.to_row()} for s in moved], self.students)
+
+    def apply_external(self, rows, deleted_ids):
+        # Changes another program already made to the stored students (see
+        # diff_student_rows): memory and indexes are updated, nothing is logged
+        for student_id in deleted_ids:
+            student = self.students.pop(student_id, None)
+            if student is not None:
+                self._unindex(student)
+        for student_id, row in rows:
+            student = StudentRecord.from_row(row, self.catalog)
+            old = self.students.get(student_id)
+            self.students[student_id] = student
+            if old is not None:
+                self._reindex_one(old, student)
+            else:
+                self._index(student)
+
+    def replace_all(self, students):
+        self.students = {s.student_id: s for s in students}
+        self.save()
+
+    def save(self):
+        # Used after records were changed in place (bulk cascades);
+        # rebuilds the indexes and writes everything right away
+        self._reindex()
+        self.storage.save(self.students)
+
+    def close(self):
+        self.storage.close(self.students)
+
+    def catalog_changed(self):
+        # Indexes that cache college/program names refresh them here
+        for index in self.indexes:
+            hook = getattr(index, 'catalog_changed', None)
+            if hook is not None:
+                hook()
+
+    def _index(self, student):
+        for index in self.indexes:
+            index.add(student)
+
+    def _unindex(self, student):
+        for index in self.indexes:
+            index.remove(student)
+
+    def _reindex_one(self, old, student):
+        for index in self.indexes:
+            if hasattr(index, 'replace'):
+                index.replace(old, student)
+            else:
+                index.remove(old)
+                index.add(student)
+
+    def _reindex(self):
+        for index in self.indexes:
+            index.rebuild(self.students.values())
@@ -0,0 +1 @@
+# Tests for the headless sms package: python -m pytest
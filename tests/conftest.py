@@ -0,0 +1,49 @@
+# A small data directory in the app's CSV formats, made the working
+# directory the way the app and the CLI expect it.
+import random
+
+import pytest
+
+from sms.catalog import COLLEGE_FIELDS, PROGRAM_FIELDS
+from sms.files import COLLEGE_CSV, PROGRAM_CSV, STUDENT_CSV, read_csv, write_csv
+from sms.students import STUDENT_FIELDS
+
+COLLEGES = [("College of Engineering", "COE"), ("College of Computer Studies", "CCS"),
+            ("College of Nursing", "CON")]
+PROGRAMS = [("Bachelor of Science in Civil Engineering", "BSCE", "COE"),
+            ("Bachelor of Science in Ceramic Engineering", "BSCerE", "COE"),
+            ("Bachelor of Science in Computer Science", "BSCS", "CCS"),
+            ("Bachelor of Science in Information Technology", "BSIT", "CCS"),
+            ("Bachelor of Science in Nursing", "BSN", "CON")]
+LAST_NAMES = ["Lee", "Garcia", "Santos", "Cruz", "Reyes", "Tan"]
+FIRST_NAMES = ["Sky", "Emery", "Maria", "Jose", "Anna", "Leo"]
+STUDENT_COUNT = 60
+
+def student_rows(count=STUDENT_COUNT, seed=0):
+    rng = random.Random(seed)
+    colleges = dict((code, name) for name, code in COLLEGES)
+    rows = []
+    for i in range(count):
+        name, code, college_code = rng.choice(PROGRAMS)
+        rows.append({'Student ID': f"2024-{i + 1:04d}", 'Last Name': rng.choice(LAST_NAMES),
+                     'First Name': rng.choice(FIRST_NAMES), 'Gender': rng.choice(("Male", "Female")),
+                     'College': colleges[college_code], 'College Code': college_code,
+                     'Program': name, 'Program Code': code, 'Year': rng.choice("1234")})
+    return rows
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    write_csv(str(tmp_path / COLLEGE_CSV), COLLEGE_FIELDS,
+              [{'College Name': name, 'College Code': code} for name, code in COLLEGES])
+    colleges = dict((code, name) for name, code in COLLEGES)
+    write_csv(str(tmp_path / PROGRAM_CSV), PROGRAM_FIELDS,
+              [{'Program Name': name, 'Program Code': code, 'College Name': colleges[college_code],
+                'College Code': college_code} for name, code, college_code in PROGRAMS])
+    write_csv(str(tmp_path / STUDENT_CSV), STUDENT_FIELDS, student_rows())
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv('SMS_STORAGE', raising=False)
+    return tmp_path
+
+def stored_students():
+    # students.csv in the working directory as {Student ID: row}
+    return {row['Student ID']: row for row in read_csv(STUDENT_CSV)}
@@ -0,0 +1,80 @@
+import csv
+import io
+import json
+import os
+
+from sms.cli import main
+from sms.files import read_csv
+from sms.students import STUDENT_FIELDS
+
+from .conftest import STUDENT_COUNT, stored_students
+
+def run(capsys, *argv):
+    code = main(list(argv))
+    out, err = capsys.readouterr()
+    return code, out, err
+
+def csv_rows(text):
+    return list(csv.DictReader(io.StringIO(text)))
+
+def test_query_filters_and_sorts(data_dir, capsys):
+    code, out, err = run(capsys, 'query', '--college', 'College of Engineering', '--gender', 'Female',
+                         '--sort', 'Last Name Asc')
+    assert code == 0
+    rows = csv_rows(out)
+    expected = [row for row in stored_students().values()
+                if row['College'] == 'College of Engineering' and row['Gender'] == 'Female']
+    assert rows and {row['Student ID'] for row in rows} == {row['Student ID'] for row in expected}
+    assert [row['Last Name'].lower() for row in rows] == sorted(row['Last Name'].lower() for row in rows)
+
+def test_query_search_year_limit_and_json(data_dir, capsys):
+    code, out, err = run(capsys, 'query', '--search', 'lee', '--year', '2', '--format', 'json')
+    assert code == 0
+    students = json.loads(out)
+    assert students == [row for row in stored_students().values() if row['Last Name'] == 'Lee' and row['Year'] == '2']
+    code, out, err = run(capsys, 'query', '--limit', '3')
+    assert len(csv_rows(out)) == 3
+
+def test_counts(data_dir, capsys):
+    code, out, err = run(capsys, 'counts', '--gender', 'Male', '--format', 'json')
+    assert code == 0
+    counts = json.loads(out)
+    rows = stored_students().values()
+    males = [row for row in rows if row['Gender'] == 'Male']
+    assert counts['totals'] == {'colleges': 3, 'programs': 5, 'students': STUDENT_COUNT, 'matching': len(males)}
+    # Each facet is counted with the other filters applied, its own left out
+    assert counts['gender'] == {gender: sum(row['Gender'] == gender for row in rows) for gender in ('Male', 'Female')}
+    assert sum(counts['college'].values()) == len(males)
+    code, out, err = run(capsys, 'counts')
+    assert f"Total Students: {STUDENT_COUNT}" in out
+
+def test_import_and_error_report(data_dir, capsys):
+    path = data_dir / 'new.csv'
+    path.write_text("Student ID,Last Name,First Name,Gender,Year,College Code,Program Code\n"
+                    "2025-0001,Lee,Sky,Male,1,COE,BSCE\n"
+                    "2025-0002,Lee,Sky,Male,1,XYZ,BSCE\n", encoding='utf-8')
+    code, out, err = run(capsys, 'import', 'new.csv')
+    assert code == 1
+    assert "Imported 1 student(s)." in out
+    assert "1 row(s) skipped" in err
+    assert [row['Student ID'] for row in read_csv('new.errors.csv')] == ['2025-0002']
+    # The import is folded into students.csv before the command ends
+    assert '2025-0001' in stored_students()
+    assert not os.path.exists('students.journal')
+
+def test_export(data_dir, capsys):
+    code, out, err = run(capsys, 'export', 'backup.csv')
+    assert code == 0 and "Exported 60 student(s)" in out
+    assert read_csv('backup.csv') == list(stored_students().values())
+    code, out, err = run(capsys, 'export')
+    assert out.splitlines()[0] == ','.join(STUDENT_FIELDS)
+    assert len(csv_rows(out)) == STUDENT_COUNT
+
+def test_data_dir_option(data_dir, tmp_path_factory, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path_factory.mktemp('elsewhere'))
+    code, out, err = run(capsys, '-C', str(data_dir), 'counts')
+    assert code == 0 and f"Total Students: {STUDENT_COUNT}" in out
+
+def test_missing_data_dir(data_dir, capsys):
+    code, out, err = run(capsys, '-C', str(data_dir / 'missing'), 'counts')
+    assert code == 2 and err.startswith("sms: ")
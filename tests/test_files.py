@@ -0,0 +1,139 @@
+import json
+import os
+import sqlite3
+
+import pytest
+
+from sms.files import WRITE_GROUP_MANIFEST, WriteGroup, append_file, read_csv, transaction, write_csv
+
+FIELDS = ['Name']
+
+def rows(*names):
+    return [{'Name': name} for name in names]
+
+def test_write_csv_leaves_no_temp_file(tmp_path):
+    path = str(tmp_path / 'a.csv')
+    write_csv(path, FIELDS, rows('x', 'y'))
+    assert read_csv(path) == rows('x', 'y')
+    assert os.listdir(tmp_path) == ['a.csv']
+
+def test_write_group_commits_every_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    committed = []
+    with WriteGroup():
+        write_csv('a.csv', FIELDS, rows('a'), on_commit=lambda: committed.append('a'))
+        write_csv('b.csv', FIELDS, rows('b'))
+        # Nothing is in place until the group ends
+        assert not os.path.exists('a.csv') and not os.path.exists('b.csv')
+    assert read_csv('a.csv') == rows('a')
+    assert read_csv('b.csv') == rows('b')
+    assert committed == ['a']
+    assert sorted(os.listdir()) == ['a.csv', 'b.csv']
+
+def test_write_group_rolls_back_on_exception(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_csv('a.csv', FIELDS, rows('old'))
+    with pytest.raises(RuntimeError):
+        with WriteGroup():
+            write_csv('a.csv', FIELDS, rows('new'))
+            write_csv('b.csv', FIELDS, rows('new'))
+            raise RuntimeError("cascade failed")
+    assert read_csv('a.csv') == rows('old')
+    assert os.listdir() == ['a.csv']
+
+def test_nested_write_group_joins_the_outer_one(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(RuntimeError):
+        with WriteGroup():
+            with WriteGroup():
+                write_csv('a.csv', FIELDS, rows('inner'))
+            assert not os.path.exists('a.csv')
+            raise RuntimeError
+    assert os.listdir() == []
+
+def test_recover_finishes_an_interrupted_commit(tmp_path, monkeypatch):
+    # A crash after the manifest was written but before every rename ran:
+    # a.csv was already replaced, b.csv still waits in its temp file
+    monkeypatch.chdir(tmp_path)
+    write_csv('a.csv', FIELDS, rows('new'))
+    write_csv('b.csv', FIELDS, rows('old'))
+    write_csv('b.csv.tmp', FIELDS, rows('new'))
+    with open(WRITE_GROUP_MANIFEST, 'w', encoding='utf-8') as f:
+        json.dump([['a.csv.tmp', 'a.csv'], ['b.csv.tmp', 'b.csv']], f)
+    WriteGroup.recover()
+    assert read_csv('a.csv') == rows('new')
+    assert read_csv('b.csv') == rows('new')
+    assert sorted(os.listdir()) == ['a.csv', 'b.csv']
+
+def test_write_group_appends_at_commit(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    append_file('log', b'1\n')
+    committed = []
+    with WriteGroup():
+        write_csv('a.csv', FIELDS, rows('a'))
+        append_file('log', b'2\n')
+        append_file('log', b'3\n', on_commit=lambda: committed.append('log'))
+        with open('log', 'rb') as f:
+            assert f.read() == b'1\n'
+    with open('log', 'rb') as f:
+        assert f.read() == b'1\n2\n3\n'
+    assert committed == ['log']
+    assert sorted(os.listdir()) == ['a.csv', 'log']
+
+def test_write_group_drops_appends_on_exception(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    append_file('log', b'1\n')
+    with pytest.raises(RuntimeError):
+        with WriteGroup():
+            append_file('log', b'2\n')
+            raise RuntimeError
+    with open('log', 'rb') as f:
+        assert f.read() == b'1\n'
+    assert os.listdir() == ['log']
+
+def test_recover_finishes_an_interrupted_append(tmp_path, monkeypatch):
+    # The log ends in a line torn by an earlier crash; the staged lines
+    # still start on a line of their own
+    monkeypatch.chdir(tmp_path)
+    with open('log', 'wb') as f:
+        f.write(b'1\n{"torn')
+    with open('log.append.tmp', 'wb') as f:
+        f.write(b'2\n')
+    with open(WRITE_GROUP_MANIFEST, 'w', encoding='utf-8') as f:
+        json.dump([['log.append.tmp', 'log', 'append']], f)
+    WriteGroup.recover()
+    with open('log', 'rb') as f:
+        assert f.read() == b'1\n{"torn\n2\n'
+    assert os.listdir() == ['log']
+
+def test_recover_without_manifest_changes_nothing(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_csv('a.csv.tmp', FIELDS, rows('stray'))
+    WriteGroup.recover()
+    assert os.listdir() == ['a.csv.tmp']
+
+def test_transaction_commits_with_the_write_group(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    conn = sqlite3.connect('t.db')
+    conn.execute("CREATE TABLE t (x)")
+    other = sqlite3.connect('t.db')
+    with WriteGroup():
+        write_csv('a.csv', FIELDS, rows('a'))
+        with transaction(conn):
+            conn.execute("INSERT INTO t VALUES (1)")
+        assert other.execute("SELECT x FROM t").fetchall() == []
+    assert other.execute("SELECT x FROM t").fetchall() == [(1,)]
+    assert read_csv('a.csv') == rows('a')
+
+def test_transaction_rolls_back_with_the_write_group(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    conn = sqlite3.connect('t.db')
+    conn.execute("CREATE TABLE t (x)")
+    with pytest.raises(RuntimeError):
+        with WriteGroup():
+            write_csv('a.csv', FIELDS, rows('a'))
+            with transaction(conn):
+                conn.execute("INSERT INTO t VALUES (1)")
+            raise RuntimeError
+    assert conn.execute("SELECT x FROM t").fetchall() == []
+    assert os.listdir() == ['t.db']
@@ -0,0 +1,90 @@
+import pytest
+
+from sms.catalog import Catalog
+from sms.importing import import_students, read_student_import, validate_import_row
+from sms.students import StudentRepository
+
+from .conftest import STUDENT_COUNT, stored_students
+
+def import_row(**fields):
+    row = {'Student ID': '2025-0001', 'Last Name': 'dela cruz', 'First Name': 'maria', 'Gender': 'Female',
+           'Year': '2', 'College Code': 'CCS', 'Program Code': 'BSCS'}
+    row.update(fields)
+    return {field: value for field, value in row.items() if value is not None}
+
+@pytest.fixture
+def catalog(data_dir):
+    return Catalog()
+
+def test_valid_row_by_code(catalog):
+    student, errors = validate_import_row(import_row(), catalog)
+    assert errors == []
+    assert (student.last_name, student.first_name) == ('Dela Cruz', 'Maria')
+    assert student.college is catalog.college('CCS')
+    assert student.program is catalog.program('BSCS')
+
+def test_valid_row_by_name(catalog):
+    row = import_row(**{'College Code': None, 'Program Code': None, 'College': 'College of Computer Studies',
+                        'Program': 'Bachelor of Science in Information Technology'})
+    student, errors = validate_import_row(row, catalog)
+    assert errors == [] and student.program is catalog.program('BSIT')
+
+def test_na_program_is_accepted(catalog):
+    student, errors = validate_import_row(import_row(**{'Program Code': 'N/A'}), catalog)
+    assert errors == [] and student.program.code == 'N/A'
+
+@pytest.mark.parametrize('fields, error', [
+    ({'Student ID': '2025-01'}, "ID No."),
+    ({'Student ID': None}, "ID No."),
+    ({'Last Name': 'Cruz2'}, "Last Name must not contain numbers"),
+    ({'First Name': ''}, "cannot be empty"),
+    ({'Gender': 'Other'}, "Gender must be Male or Female"),
+    ({'Gender': None}, "select a Gender"),
+    ({'Year': '5'}, "Year Level must be 1, 2, 3 or 4"),
+    ({'College Code': 'XYZ'}, "College XYZ does not exist"),
+    ({'Program Code': 'BSN'}, "Program BSN does not exist in College of Computer Studies"),
+    ({'Program Code': None}, "select a Program"),
+])
+def test_invalid_rows(catalog, fields, error):
+    student, errors = validate_import_row(import_row(**fields), catalog)
+    assert student is None
+    assert any(error in e for e in errors), errors
+
+def test_unlisted_college_is_rejected(catalog):
+    catalog.delete_college(catalog.college('CON'), catalog.college_ref('N/A', 'N/A'))
+    student, errors = validate_import_row(import_row(**{'College Code': 'CON', 'Program Code': 'BSN'}), catalog)
+    assert student is None and any("College CON does not exist" in e for e in errors)
+
+def write_import(path, text):
+    path.write_text(text, encoding='utf-8-sig')
+    return str(path)
+
+def test_import_reads_spreadsheet_files(data_dir):
+    path = write_import(data_dir / 'new.csv', "ID No.;last_name;First Name;Gender;Year Level;College Code;Program Code\n"
+                                              "2025-0001;Lee;Sky;Male;1;COE;BSCE\n\n")
+    assert list(read_student_import(path)) == [(2, {
+        'Student ID': '2025-0001', 'Last Name': 'Lee', 'First Name': 'Sky', 'Gender': 'Male', 'Year': '1',
+        'College Code': 'COE', 'Program Code': 'BSCE'})]
+
+def test_import_reports_missing_columns(data_dir):
+    path = write_import(data_dir / 'new.csv', "Student ID,Last Name\n2025-0001,Lee\n")
+    with pytest.raises(ValueError, match="First Name"):
+        list(read_student_import(path))
+
+def test_import_adds_valid_rows_and_lists_the_rest(data_dir):
+    path = write_import(data_dir / 'new.csv',
+                        "Student ID,Last Name,First Name,Gender,Year,College Code,Program Code\n"
+                        "2025-0001,Lee,Sky,Male,1,COE,BSCE\n"
+                        "2025-0001,Tan,Leo,Male,2,COE,BSCE\n"
+                        "2024-0001,Tan,Leo,Male,2,COE,BSCE\n"
+                        "2025-0002,Tan,Leo,Male,9,COE,BSCE\n"
+                        "2025-0003,Cruz,Anna,Female,4,CON,BSN\n")
+    repo = StudentRepository(catalog=Catalog())
+    imported, errors = import_students(path, repo, repo.catalog)
+    assert imported == 2
+    assert [(line, student_id) for line, student_id, row_errors in errors] == [
+        (3, '2025-0001'), (4, '2024-0001'), (5, '2025-0002')]
+    repo.close()
+    stored = stored_students()
+    assert len(stored) == STUDENT_COUNT + 2
+    assert stored['2025-0003']['Program'] == 'Bachelor of Science in Nursing'
@@ -0,0 +1,173 @@
+import json
+import os
+
+import pytest
+
+from sms.files import WRITE_GROUP_MANIFEST
+from sms.logic import CollegeManagerLogic, ProgramManagerLogic, open_data
+from sms.students import STUDENT_JOURNAL, SqliteStudentStorage
+
+from .conftest import stored_students
+
+def reload_rows():
+    # Every student as a fresh open_data() sees it, next to students.csv
+    data = open_data()
+    return {student_id: student.to_row() for student_id, student in data.repo.students.items()}
+
+def assert_round_trip(data):
+    # Memory, a reload from disk and students.csv itself all agree
+    data.repo.close()
+    in_memory = {student_id: student.to_row() for student_id, student in data.repo.students.items()}
+    assert reload_rows() == in_memory
+    assert stored_students() == in_memory
+    assert not os.path.exists(WRITE_GROUP_MANIFEST)
+
+def students_of(data, field, value):
+    return {i for i, s in data.repo.students.items() if s[field] == value}
+
+def test_college_code_change(data_dir):
+    data = open_data()
+    coe = students_of(data, 'College Code', 'COE')
+    counts = CollegeManagerLogic(data).edit_college('COE', 'College of Engineering', 'ENG')
+    assert counts == {'colleges': 1, 'programs': 2, 'students': len(coe)}
+    assert students_of(data, 'College Code', 'ENG') == coe
+    assert_round_trip(data)
+    assert {row['College Code'] for row in stored_students().values() if row['Student ID'] in coe} == {'ENG'}
+
+def test_college_delete(data_dir):
+    data = open_data()
+    ccs = students_of(data, 'College Code', 'CCS')
+    counts = CollegeManagerLogic(data).delete_college('CCS')
+    assert counts == {'colleges': 1, 'programs': 2, 'students': len(ccs)}
+    assert students_of(data, 'College', 'N/A') == ccs
+    assert_round_trip(data)
+    assert 'CCS' not in {c.code for c in open_data().catalog.colleges}
+    # The programs stay, under the unlisted 'N/A' college
+    assert {p.college.code for p in open_data().catalog.programs if p.code in ('BSCS', 'BSIT')} == {'N/A'}
+
+def test_program_rename_and_code_change(data_dir):
+    data = open_data()
+    bscs = students_of(data, 'Program Code', 'BSCS')
+    logic = ProgramManagerLogic(data)
+    index = next(i for i, p in enumerate(logic.programs) if p.code == 'BSCS')
+    ok, message = logic.update_program(index, 'College of Computer Studies', 'BS Computing', 'BSCOMP')
+    assert ok and f"{len(bscs)} student(s)" in message
+    assert students_of(data, 'Program Code', 'BSCOMP') == bscs
+    assert_round_trip(data)
+    assert {row['Program'] for row in stored_students().values() if row['Student ID'] in bscs} == {'BS Computing'}
+
+def test_program_delete(data_dir):
+    data = open_data()
+    bsn = students_of(data, 'Program Code', 'BSN')
+    logic = ProgramManagerLogic(data)
+    index = next(i for i, p in enumerate(logic.programs) if p.code == 'BSN')
+    ok, message = logic.delete_program(index)
+    assert ok and f"{len(bsn)} student(s)" in message
+    assert students_of(data, 'Program', 'N/A') == bsn
+    assert_round_trip(data)
+    assert 'BSN' not in {p.code for p in open_data().catalog.programs}
+
+def test_cascade_after_journaled_edits(data_dir):
+    # The cascade's journal entries go after the edits already there
+    data = open_data()
+    data.repo.delete('2024-0001')
+    CollegeManagerLogic(data).edit_college('CON', 'College of Nursing', 'NUR')
+    assert '2024-0001' not in reload_rows()
+    assert_round_trip(data)
+    assert '2024-0001' not in stored_students()
+
+def test_rename_only_writes_the_affected_students(data_dir):
+    data = open_data()
+    before = stored_students()
+    bsn = students_of(data, 'Program Code', 'BSN')
+    logic = ProgramManagerLogic(data)
+    index = next(i for i, p in enumerate(logic.programs) if p.code == 'BSN')
+    logic.update_program(index, 'College of Nursing', 'BS Nursing', 'BSN')
+    # students.csv is left alone; the journal has one entry per student
+    assert stored_students() == before
+    with open(STUDENT_JOURNAL, encoding='utf-8') as f:
+        entries = [json.loads(line) for line in f]
+    assert {entry['student']['Student ID'] for entry in entries} == bsn and len(entries) == len(bsn)
+    assert {i for i, row in reload_rows().items() if row['Program'] == 'BS Nursing'} == bsn
+    assert_round_trip(data)
+
+def test_failed_cascade_writes_nothing(data_dir, monkeypatch):
+    # The students were already logged when the cascade failed; their
+    # entries are dropped with the catalog files
+    data = open_data()
+    before = reload_rows()
+    rewrite = data.repo.rewrite
+    def rewrite_then_fail(students):
+        rewrite(students)
+        raise OSError("disk full")
+    monkeypatch.setattr(data.repo, 'rewrite', rewrite_then_fail)
+    with pytest.raises(OSError):
+        CollegeManagerLogic(data).edit_college('COE', 'College of Engineering', 'ENG')
+    assert reload_rows() == before
+    assert open_data().catalog.college('COE') is not None
+    assert not os.path.exists(STUDENT_JOURNAL)
+
+def test_college_rename_keeping_the_code(data_dir):
+    data = open_data()
+    coe = students_of(data, 'College Code', 'COE')
+    counts = CollegeManagerLogic(data).update_college('College of Engineering', 'COE', 'Engineering', 'COE')
+    assert counts['students'] == len(coe)
+    assert_round_trip(data)
+    assert {row['College'] for row in stored_students().values() if row['Student ID'] in coe} == {'Engineering'}
+    assert 'College of Engineering' not in {row['College'] for row in stored_students().values()}
+
+def test_college_edit_changing_nothing(data_dir):
+    data = open_data()
+    counts = CollegeManagerLogic(data).update_college('College of Engineering', 'COE',
+                                                      'College of Engineering', 'COE')
+    assert counts['students'] == 0
+    assert_round_trip(data)
+
+def test_program_rename_keeping_the_code(data_dir):
+    data = open_data()
+    bsit = students_of(data, 'Program Code', 'BSIT')
+    logic = ProgramManagerLogic(data)
+    index = next(i for i, p in enumerate(logic.programs) if p.code == 'BSIT')
+    ok, message = logic.update_program(index, 'College of Computer Studies', 'BS Info Tech', 'BSIT')
+    assert ok and f"{len(bsit)} student(s)" in message
+    assert_round_trip(data)
+    assert {row['Program'] for row in stored_students().values() if row['Student ID'] in bsit} == {'BS Info Tech'}
+
+def test_delete_only_writes_the_moved_students(data_dir):
+    data = open_data()
+    before = stored_students()
+    bsn = students_of(data, 'Program Code', 'BSN')
+    logic = ProgramManagerLogic(data)
+    logic.delete_program(next(i for i, p in enumerate(logic.programs) if p.code == 'BSN'))
+    assert stored_students() == before
+    with open(STUDENT_JOURNAL, encoding='utf-8') as f:
+        entries = [json.loads(line) for line in f]
+    assert [entry['student']['Student ID'] for entry in entries] == sorted(bsn)
+    assert {i for i, row in reload_rows().items() if row['Program'] == 'N/A'} == bsn
+    assert_round_trip(data)
+
+def sqlite_rows():
+    data = open_data(SqliteStudentStorage())
+    data.repo.close()
+    return {student_id: student.to_row() for student_id, student in data.repo.students.items()}
+
+def test_sqlite_cascade_commits_with_the_catalog(data_dir):
+    data = open_data(SqliteStudentStorage())
+    ccs = students_of(data, 'College Code', 'CCS')
+    CollegeManagerLogic(data).delete_college('CCS')
+    in_memory = {student_id: student.to_row() for student_id, student in data.repo.students.items()}
+    assert sqlite_rows() == in_memory
+    assert {i for i, row in in_memory.items() if row['College'] == 'N/A'} == ccs
+
+def test_failed_sqlite_cascade_writes_nothing(data_dir, monkeypatch):
+    data = open_data(SqliteStudentStorage())
+    before = sqlite_rows()
+    repoint = data.repo.repoint
+    def repoint_then_fail(students, **refs):
+        repoint(students, **refs)
+        raise OSError("disk full")
+    monkeypatch.setattr(data.repo, 'repoint', repoint_then_fail)
+    with pytest.raises(OSError):
+        CollegeManagerLogic(data).delete_college('CCS')
+    assert sqlite_rows() == before
+    assert open_data().catalog.college('CCS') is not None
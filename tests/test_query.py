@@ -0,0 +1,232 @@
+import random
+from collections import defaultdict
+
+import pytest
+
+from sms import query
+from sms.catalog import Catalog
+from sms.query import (FACET_ALL, FACETS, STUDENT_SORTS, IncrementalSearch, StudentColumns, StudentSearchIndex,
+                       search_tokens)
+from sms.students import StudentRecord, StudentRepository, student_matches
+
+from .conftest import FIRST_NAMES, LAST_NAMES
+
+SORTS = [None, "First Name Asc", "Last Name Desc", "Year Asc", "Year Desc", "Gender", "Year"]
+
+def scan(repo, college, program, gender, year, sort_option=None, student_ids=None):
+    # What StudentRepository.query returns without a column index
+    candidates = repo.students.values() if student_ids is None else [repo.students[i] for i in student_ids]
+    students = [s for s in candidates if student_matches(s, college, program, gender, year)]
+    sort = STUDENT_SORTS.get(sort_option)
+    if sort is not None:
+        students.sort(key=sort[0], reverse=sort[2])
+    return students
+
+def scan_counts(repo, filters):
+    counts = {facet: defaultdict(int) for facet in FACETS}
+    for student in repo.students.values():
+        values = (student["College"], student["Program"], student["Gender"], student["Year"])
+        for i, facet in enumerate(FACETS):
+            if student_matches(student, *(FACET_ALL[f] if f == facet else v for f, v in zip(FACETS, filters))):
+                counts[facet][values[i]] += 1
+    return counts
+
+def filter_choices(catalog):
+    return ([FACET_ALL['college']] + [c.name for c in catalog.colleges],
+            [FACET_ALL['program']] + [p.name for p in catalog.programs],
+            [FACET_ALL['gender'], "Male", "Female"], [FACET_ALL['year'], "1", "2", "3", "4"])
+
+def assert_same_students(found, expected, sort_option):
+    assert sorted(s.student_id for s in found) == sorted(s.student_id for s in expected)
+    if sort_option is not None:
+        # Ties may come out in either order; the sort keys may not
+        key = STUDENT_SORTS[sort_option][0]
+        assert [key(s) for s in found] == [key(s) for s in expected]
+
+def check_against_scan(repo, rng, rounds=40):
+    colleges, programs, genders, years = filter_choices(repo.catalog)
+    for _ in range(rounds):
+        college, program, gender, year = filters = (rng.choice(colleges), rng.choice(programs),
+                                                    rng.choice(genders), rng.choice(years))
+        for sort_option in SORTS:
+            assert_same_students(repo.query(college, program, gender, sort_option, year=year),
+                                 scan(repo, *filters, sort_option=sort_option), sort_option)
+        assert ({f: dict(c) for f, c in repo.facet_counts(*filters).items()} ==
+                {f: dict(c) for f, c in scan_counts(repo, filters).items()})
+
+def random_edit(repo, rng, next_id):
+    catalog = repo.catalog
+    action = rng.random()
+    ids = list(repo.students)
+    if action < 0.4 or not ids:
+        program = rng.choice(catalog.programs)
+        repo.add(StudentRecord(f"2025-{next_id:04d}", rng.choice(LAST_NAMES), rng.choice(FIRST_NAMES),
+                               rng.choice(("Male", "Female")), rng.choice("1234"), program.college, program))
+    elif action < 0.75:
+        old = repo.get(rng.choice(ids))
+        program = rng.choice(catalog.programs)
+        repo.put(StudentRecord(old.student_id, rng.choice(LAST_NAMES), old.first_name,
+                               rng.choice(("Male", "Female")), rng.choice("1234"), program.college, program))
+    else:
+        repo.delete(rng.choice(ids))
+
+@pytest.fixture
+def indexed_repo(data_dir):
+    repo = StudentRepository(catalog=Catalog())
+    repo.add_index(StudentColumns())
+    return repo
+
+def test_query_matches_scan_on_load(indexed_repo):
+    check_against_scan(indexed_repo, random.Random(1))
+
+@pytest.mark.parametrize('seed', range(3))
+def test_query_matches_scan_after_edits(indexed_repo, seed):
+    rng = random.Random(seed)
+    check_against_scan(indexed_repo, rng, rounds=5)
+    for i in range(150):
+        random_edit(indexed_repo, rng, i)
+        if i % 30 == 0:
+            check_against_scan(indexed_repo, rng, rounds=5)
+    check_against_scan(indexed_repo, rng)
+
+def test_query_matches_scan_across_rebuilds_and_compaction(indexed_repo, monkeypatch):
+    # Small limits so the bitmaps and sorted orders are rebuilt and the
+    # deleted slots compacted away in the middle of the edits
+    monkeypatch.setattr(query, 'BITMAP_REBUILD_CHANGES', 4)
+    monkeypatch.setattr(query, 'ORDER_REBUILD_CHANGES', 4)
+    monkeypatch.setattr(query, 'COLUMN_COMPACT_MIN', 8)
+    rng = random.Random(7)
+    columns = indexed_repo.query_index
+    check_against_scan(indexed_repo, rng, rounds=5)
+    for i in range(300):
+        random_edit(indexed_repo, rng, i)
+        if i % 7 == 0:
+            check_against_scan(indexed_repo, rng, rounds=3)
+    for student_id in list(indexed_repo.students)[::2]:
+        indexed_repo.delete(student_id)
+    check_against_scan(indexed_repo, rng)
+    assert columns.dead * 2 <= len(columns.records)
+
+def test_query_with_search_matches(indexed_repo):
+    search = StudentSearchIndex()
+    indexed_repo.add_index(search)
+    ids = search.search("lee")
+    assert ids and all(indexed_repo.get(i).last_name == "Lee" for i in ids)
+    found = indexed_repo.query(gender="Female", sort_option="Year Asc", student_ids=ids)
+    expected = scan(indexed_repo, "All Colleges", "All Programs", "Female", "All Years", "Year Asc", ids)
+    assert_same_students(found, expected, "Year Asc")
+
+def test_renames_reach_the_name_filters(indexed_repo):
+    catalog = indexed_repo.catalog
+    catalog.listeners.append(indexed_repo.catalog_changed)
+    college = catalog.college("CCS")
+    before = {s.student_id for s in indexed_repo.query("College of Computer Studies")}
+    catalog.update_college(college, "Computing", "CCS")
+    assert indexed_repo.query("College of Computer Studies") == []
+    assert {s.student_id for s in indexed_repo.query("Computing")} == before
+    assert indexed_repo.facet_counts()['college']["Computing"] == len(before)
+
+def scan_search(repo, query):
+    # Students whose ID, names, college or program have a word starting
+    # with each word of the query
+    def words(student):
+        return search_tokens(' '.join((student.student_id, student.last_name, student.first_name,
+                                       student.college.name, student.college.code,
+                                       student.program.name, student.program.code)))
+    tokens = search_tokens(query)
+    return {student.student_id for student in repo.students.values()
+            if all(any(word.startswith(token) for word in words(student)) for token in tokens)}
+
+def search_all(search, repo, query):
+    ids = search.search(query)
+    return set(repo.students) if ids is None else set(ids)
+
+SEARCHES = ["lee", "le", "l", "sky lee", "2024-001", "2024", "0005", "nursing", "computer sc", "bscs",
+            "college", "bachelor of science in", "engineering garcia", "zzz", "", "ma jo"]
+
+def test_search_matches_scan(indexed_repo):
+    search = StudentSearchIndex()
+    indexed_repo.add_index(search)
+    rng = random.Random(3)
+    for i in range(120):
+        for text in SEARCHES:
+            assert search_all(search, indexed_repo, text) == scan_search(indexed_repo, text)
+        random_edit(indexed_repo, rng, i)
+    indexed_repo.catalog.listeners.append(indexed_repo.catalog_changed)
+    indexed_repo.catalog.update_program(indexed_repo.catalog.program("BSN"), "Nursing Science", "BSNS",
+                                        indexed_repo.catalog.college("CON"))
+    for text in SEARCHES + ["nursing sc", "bsns"]:
+        assert search_all(search, indexed_repo, text) == scan_search(indexed_repo, text)
+
+def test_search_after_edits_before_the_first_search(indexed_repo):
+    # The prefix maps are only built by the first search, after these
+    search = StudentSearchIndex()
+    indexed_repo.add_index(search)
+    rng = random.Random(4)
+    for i in range(40):
+        random_edit(indexed_repo, rng, i)
+    indexed_repo.catalog.listeners.append(indexed_repo.catalog_changed)
+    indexed_repo.catalog.update_college(indexed_repo.catalog.college("CCS"), "Computing", "CMP")
+    for text in SEARCHES + ["computing", "cmp"]:
+        assert search_all(search, indexed_repo, text) == scan_search(indexed_repo, text)
+
+class Scheduler:
+    # Stands in for the Tk widget: after() queues, run() fires what is due
+    def __init__(self):
+        self.pending = {}
+        self.next_id = 0
+
+    def after(self, delay, callback):
+        self.next_id += 1
+        self.pending[self.next_id] = callback
+        return self.next_id
+
+    def after_cancel(self, after_id):
+        del self.pending[after_id]
+
+    def run(self):
+        pending, self.pending = self.pending, {}
+        for callback in pending.values():
+            callback()
+
+class RecordingIndex(StudentSearchIndex):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def search(self, query, candidates=None):
+        self.calls.append((query, candidates))
+        return super().search(query, candidates)
+
+def test_incremental_search_waits_for_typing_to_pause():
+    scheduler = Scheduler()
+    runs = []
+    live = IncrementalSearch(scheduler, StudentSearchIndex(), lambda: runs.append(1))
+    for _ in "garc":
+        live.schedule()
+    assert len(scheduler.pending) == 1 and runs == []
+    scheduler.run()
+    assert runs == [1]
+    live.schedule()
+    live.cancel()
+    scheduler.run()
+    assert runs == [1]
+
+def test_incremental_search_narrows_the_last_result(indexed_repo):
+    index = RecordingIndex()
+    indexed_repo.add_index(index)
+    live = IncrementalSearch(Scheduler(), index, lambda: None)
+    first = live.search("sa")
+    narrowed = live.search(" San ")
+    assert first and index.calls[-1] == ("san", first)
+    assert narrowed == scan_search(indexed_repo, "san")
+    # A query that doesn't extend the last one searches everything again
+    live.search("ga")
+    assert index.calls[-1] == ("ga", None)
+    # So does one after an edit, which may have added matches
+    last = live.search("gar")
+    student = next(s for s in indexed_repo.students.values() if s.last_name != "Garcia")
+    indexed_repo.put(StudentRecord(student.student_id, "Garcia", student.first_name, student.gender,
+                                   student.year, student.college, student.program))
+    assert student.student_id in live.search("garc")
+    assert index.calls[-1] == ("garc", None) and student.student_id not in last
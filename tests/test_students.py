@@ -0,0 +1,197 @@
+import os
+import random
+import sqlite3
+
+import pytest
+
+from sms.catalog import Catalog
+from sms.students import (STUDENT_DB, STUDENT_JOURNAL, CsvStudentStorage, SqliteStudentStorage, StudentJournal,
+                          StudentRecord, StudentRepository)
+
+from .conftest import STUDENT_COUNT, stored_students
+from .test_query import check_against_scan, random_edit
+
+def renamed(row, last_name):
+    return dict(row, **{'Last Name': last_name})
+
+def test_journal_replay_applies_puts_and_deletes(data_dir):
+    rows = stored_students()
+    journal = StudentJournal()
+    journal.append([{'op': 'put', 'student': renamed(rows['2024-0001'], 'Changed')},
+                    {'op': 'delete', 'id': '2024-0002'},
+                    {'op': 'put', 'student': renamed(rows['2024-0002'], 'Back')},
+                    {'op': 'delete', 'id': '2024-0003'}])
+    students = CsvStudentStorage().load()
+    assert students['2024-0001']['Last Name'] == 'Changed'
+    assert students['2024-0002']['Last Name'] == 'Back'
+    assert '2024-0003' not in students
+    assert len(students) == STUDENT_COUNT - 1
+
+def test_journal_replay_cuts_a_torn_line(data_dir):
+    rows = stored_students()
+    journal = StudentJournal()
+    journal.append([{'op': 'delete', 'id': '2024-0001'}])
+    with open(STUDENT_JOURNAL, 'a', encoding='utf-8') as f:
+        f.write('{"op": "delete", "id": "2024-')
+    changes, count = journal.changes()
+    assert changes == {'2024-0001': None} and count == 1
+    # The next append starts on a clean line and is read back
+    journal.append([{'op': 'put', 'student': renamed(rows['2024-0004'], 'After')}])
+    students = CsvStudentStorage().load()
+    assert '2024-0001' not in students
+    assert students['2024-0004']['Last Name'] == 'After'
+
+def test_repository_edits_survive_a_reload(data_dir):
+    repo = StudentRepository()
+    student = repo.get('2024-0005')
+    repo.update('2024-0005', StudentRecord('2024-9999', 'Moved', student.first_name, student.gender,
+                                           student.year, student.college, student.program))
+    repo.delete('2024-0006')
+    # Only the journal was written
+    assert stored_students()['2024-0005']['Last Name'] == student.last_name
+    reloaded = StudentRepository()
+    assert '2024-0005' not in reloaded and '2024-0006' not in reloaded
+    assert reloaded.get('2024-9999').last_name == 'Moved'
+
+def test_compaction_folds_the_journal_into_the_csv(data_dir):
+    storage = CsvStudentStorage(compact_threshold=3)
+    repo = StudentRepository(storage)
+    for student_id in ('2024-0001', '2024-0002', '2024-0003'):
+        repo.delete(student_id)
+    storage.wait_for_compaction()
+    assert not os.path.exists(STUDENT_JOURNAL)
+    assert not os.path.exists(storage.journal.pending_path)
+    assert set(stored_students()) == set(repo.students)
+    assert not storage.changed_on_disk()
+
+def test_edits_during_compaction_stay_in_the_new_journal(data_dir):
+    storage = CsvStudentStorage(compact_threshold=2)
+    repo = StudentRepository(storage)
+    repo.delete('2024-0001')
+    repo.delete('2024-0002')
+    repo.delete('2024-0003')
+    storage.wait_for_compaction()
+    assert os.path.exists(STUDENT_JOURNAL)
+    assert set(StudentRepository().students) == set(repo.students)
+
+def test_an_unfinished_compaction_is_replayed(data_dir):
+    # A crash after the journal was rotated but before the new CSV was in
+    # place: both journals are replayed, the rotated one first
+    rows = stored_students()
+    journal = StudentJournal()
+    journal.append([{'op': 'put', 'student': renamed(rows['2024-0001'], 'First')}])
+    journal.rotate()
+    journal.append([{'op': 'put', 'student': renamed(rows['2024-0001'], 'Second')},
+                    {'op': 'delete', 'id': '2024-0002'}])
+    students = CsvStudentStorage().load()
+    assert students['2024-0001']['Last Name'] == 'Second'
+    assert '2024-0002' not in students
+    # Rotating again keeps the older entries ahead of the newer ones
+    journal.rotate()
+    assert not os.path.exists(STUDENT_JOURNAL)
+    assert CsvStudentStorage().load()['2024-0001']['Last Name'] == 'Second'
+
+def test_close_compacts_outstanding_entries(data_dir):
+    repo = StudentRepository()
+    repo.delete('2024-0001')
+    repo.close()
+    assert not os.path.exists(STUDENT_JOURNAL)
+    assert '2024-0001' not in stored_students()
+
+def test_close_during_a_load_keeps_the_stored_students(data_dir):
+    rows = stored_students()
+    StudentJournal().append([{'op': 'put', 'student': renamed(rows['2024-0001'], 'Journaled')}])
+    repo = StudentRepository(preload=False)
+    repo.begin_load()
+    repo.load_chunk(next(repo.storage.load_chunks(10)))
+    repo.close()
+    with pytest.raises(ValueError):
+        repo.storage.compact(repo.students)
+    assert len(stored_students()) == STUDENT_COUNT
+    assert os.path.exists(STUDENT_JOURNAL)
+
+def test_close_after_a_failed_load_keeps_the_stored_students(data_dir):
+    # The loader gives up on the first chunk (a read error) and finishes
+    StudentJournal().append([{'op': 'delete', 'id': '2024-0001'}])
+    repo = StudentRepository(preload=False)
+    repo.begin_load()
+    for chunk in repo.storage.load_chunks(10):
+        repo.load_chunk(chunk)
+        break
+    repo.finish_load()
+    repo.close()
+    assert len(stored_students()) == STUDENT_COUNT
+
+def test_records_resolve_against_the_catalog(data_dir):
+    catalog = Catalog()
+    repo = StudentRepository(catalog=catalog)
+    student = repo.get('2024-0001')
+    assert student.college is catalog.college(student['College Code'])
+    assert student.program is catalog.program(student['Program Code'])
+    assert student.to_row() == stored_students()['2024-0001']
+
+def sqlite_repo():
+    return StudentRepository(SqliteStudentStorage(), Catalog())
+
+def rows_of(repo):
+    return {student_id: student.to_row() for student_id, student in repo.students.items()}
+
+def test_sqlite_first_run_imports_the_csv(data_dir):
+    repo = sqlite_repo()
+    assert os.path.exists(STUDENT_DB)
+    assert rows_of(repo) == stored_students()
+    repo.close()
+
+@pytest.mark.parametrize('seed', range(2))
+def test_sqlite_query_matches_scan_after_edits(data_dir, seed):
+    # Filtering and sorting run in SQL here
+    repo = sqlite_repo()
+    rng = random.Random(seed)
+    check_against_scan(repo, rng, rounds=5)
+    for i in range(80):
+        random_edit(repo, rng, i)
+    check_against_scan(repo, rng)
+    repo.close()
+
+def test_sqlite_edits_survive_a_reload(data_dir):
+    repo = sqlite_repo()
+    student = repo.get('2024-0005')
+    repo.update('2024-0005', StudentRecord('2024-9999', 'Moved', student.first_name, student.gender,
+                                           student.year, student.college, student.program))
+    repo.delete('2024-0006')
+    reloaded = sqlite_repo()
+    assert rows_of(reloaded) == rows_of(repo)
+    assert reloaded.get('2024-9999').last_name == 'Moved'
+    reloaded.close()
+    repo.close()
+
+def test_sqlite_save_replaces_every_row(data_dir):
+    repo = sqlite_repo()
+    repo.replace_all(list(repo.students.values())[:10])
+    reloaded = sqlite_repo()
+    assert rows_of(reloaded) == rows_of(repo) and len(reloaded) == 10
+    reloaded.close()
+    repo.close()
+
+def test_sqlite_notices_changes_from_another_connection(data_dir):
+    repo = sqlite_repo()
+    repo.delete('2024-0001')
+    # Our own commits don't count
+    assert not repo.storage.changed_on_disk()
+    conn = sqlite3.connect(STUDENT_DB)
+    with conn:
+        conn.execute("DELETE FROM students WHERE student_id = '2024-0002'")
+    conn.close()
+    assert repo.storage.changed_on_disk()
+    assert '2024-0002' not in repo.refresh()
+    assert not repo.storage.changed_on_disk()
+    repo.close()
+
+def test_sqlite_close_exports_the_csv_and_closes_the_database(data_dir):
+    repo = sqlite_repo()
+    repo.delete('2024-0001')
+    assert '2024-0001' in stored_students()
+    repo.close()
+    assert stored_students() == rows_of(repo)
+    with pytest.raises(sqlite3.ProgrammingError):
+        repo.storage.conn.execute("SELECT 1")